@@ -3,6 +3,7 @@ try:
     import vertical_icons_rc
 except ImportError:
     from ButtonsDialog.vertical import vertical_icons_rc
+from imagebridge import qpixmapView
 import numpy as np
 import cv2
 from time import time
@@ -151,18 +152,8 @@ class paintButton(Button):
 
     @staticmethod
     def convertQPixmapToMat(incomingImage: QtGui.QPixmap):
-        """ Converts a QImage into an opencv MAT format  """
-
-        incomingImage = incomingImage.toImage().convertToFormat(QtGui.QImage.Format_RGBA8888)
-
-        width = incomingImage.width()
-        height = incomingImage.height()
-
-        ptr = incomingImage.bits()
-        ptr.setsize(incomingImage.byteCount())
-        arr = np.array(ptr).reshape(height, width, 4)  # Copies the data
-
-        return arr
+        """ Returns a read only RGBA opencv MAT view of a QPixmap's pixels """
+        return qpixmapView(incomingImage, QtGui.QImage.Format_RGBA8888)
 
 
 class verticalButtonsDialog(QtWidgets.QMainWindow):
@@ -56,7 +56,14 @@ class SettingsDataBase(DataBaseTemplate.DataBaseHandlerTemplate):
         self.settings = {'dest': str,
                          'imsource': set,
                          'saves': str,
-                         'source': str
+                         'source': str,
+                         'confidenceThreshold': int,
+                         'psm': str,
+                         'ocrProcesses': int,
+                         'ocrTimeout': int,
+                         'warmUpIdle': int,
+                         'preset': str,
+                         'liveTranslation': bool
                          }  # supports all and only
         # json data types or converted types by pythonObjectToJson
         self.path = path
@@ -79,6 +86,9 @@ class SettingsDataBase(DataBaseTemplate.DataBaseHandlerTemplate):
     def is_settings(self) -> bool:
         return bool(self.data)
 
+    def is_setting(self, setting: str) -> bool:
+        return setting in self.data
+
     def get_setting(self, setting):
         value = deepcopy(self.data[setting])
         if self.settings[setting] in self.jsonToPythonObject:
@@ -8,7 +8,7 @@ except ModuleNotFoundError:
     from extendedcombobox import ExtendedComboBox
     from LanguagesInsertionWidget import LanguageInsertiona
 from PyQt5 import QtWidgets, QtCore, QtGui
-from TranslationWindow.Translate import languages
+from TranslationWindow.Translate import languages, warmUpOCR, translationCache
 import os.path
 
 
@@ -81,6 +81,9 @@ class PreferenceDialog(shortcutEditor):
         database = SettingsDataBase(pathToDatabase)
         if not database.is_settings():
             database.insert_settings(defaultSettings)
+        # settings that were added after the database was created
+        database.insert_settings({setting: value for setting, value in defaultSettings.items()
+                                  if not database.is_setting(setting)})
         # now it must have settings
         database.save_changes()
         return database
@@ -106,7 +109,14 @@ class PreferenceDialog(shortcutEditor):
             'dest': <dest (str)> ,
             'imsource': <imsource (list)>,
             'saves': <saves (str)>,
-            'source': <source (str)>
+            'source': <source (str)>,
+            'confidenceThreshold': <mean OCR confidence that settles a capture (int)>,
+            'psm': <page segmentation mode: 'auto', 'word', 'line', 'block' or 'sparse' (str)>,
+            'ocrProcesses': <number of worker processes that read captures, 0 for none (int)>,
+            'ocrTimeout': <seconds OCR of a capture may take, 0 for no limit (int)>,
+            'warmUpIdle': <minutes of idle after which the OCR models are warmed again, 0 for never (int)>,
+            'preset': <OCR pipeline: 'fast', 'balanced' or 'accurate' (str)>,
+            'liveTranslation': <translate the text of a translation window while it is typed (bool)>
         }
         """
         super(PreferenceDialog, self).__init__(parent, defaultShortcuts, shortcutsDBPath, countMenu, listener=listener)
@@ -174,6 +184,78 @@ class PreferenceDialog(shortcutEditor):
         self.pathLabel = QtWidgets.QLabel('Saves Folder')
         self.pathLineEdit = pathLineEdit(self.settingsDB)
 
+        self.confidenceLabel = QtWidgets.QLabel('OCR Confidence')
+        self.confidenceSpinBox = QtWidgets.QSpinBox(self)
+        self.confidenceSpinBox.setRange(0, 100)
+        self.confidenceSpinBox.setSuffix('%')
+        self.confidenceSpinBox.setToolTip('Stop trying other image filters once the text is read with this confidence')
+        self.confidenceSpinBox.setValue(currentSettings['confidenceThreshold'])
+        self.confidenceSpinBox.valueChanged.connect(self.confidenceChanged)
+
+        self.psmLabel = QtWidgets.QLabel('Text Layout')
+        self.psmCombo = QtWidgets.QComboBox(self)
+        for i, (setting, name) in enumerate((('auto', 'Automatic'),
+                                             ('word', 'Single word'),
+                                             ('line', 'Single line'),
+                                             ('block', 'Block of text'),
+                                             ('sparse', 'Sparse text'))):
+            self.psmCombo.addItem(name)
+            self.psmCombo.setItemData(i, setting)
+        self.psmCombo.setCurrentIndex(self.psmCombo.findData(currentSettings['psm']))
+        self.psmCombo.currentIndexChanged.connect(self.psmChanged)
+
+        self.processesLabel = QtWidgets.QLabel('OCR Processes')
+        self.processesSpinBox = QtWidgets.QSpinBox(self)
+        self.processesSpinBox.setRange(0, os.cpu_count() or 4)
+        self.processesSpinBox.setSpecialValueText('Off')
+        self.processesSpinBox.setToolTip('Read captures in separate processes so the app stays responsive.\n'
+                                         'Takes effect after a restart')
+        self.processesSpinBox.setValue(currentSettings['ocrProcesses'])
+        self.processesSpinBox.valueChanged.connect(self.processesChanged)
+
+        self.timeoutLabel = QtWidgets.QLabel('OCR Timeout')
+        self.timeoutSpinBox = QtWidgets.QSpinBox(self)
+        self.timeoutSpinBox.setRange(0, 300)
+        self.timeoutSpinBox.setSuffix(' s')
+        self.timeoutSpinBox.setSpecialValueText('None')
+        self.timeoutSpinBox.setToolTip('Give up reading a capture after this many seconds')
+        self.timeoutSpinBox.setValue(currentSettings['ocrTimeout'])
+        self.timeoutSpinBox.valueChanged.connect(self.timeoutChanged)
+
+        self.warmUpLabel = QtWidgets.QLabel('Re-warm OCR After')
+        self.warmUpSpinBox = QtWidgets.QSpinBox(self)
+        self.warmUpSpinBox.setRange(0, 240)
+        self.warmUpSpinBox.setSuffix(' min')
+        self.warmUpSpinBox.setSpecialValueText('Never')
+        self.warmUpSpinBox.setToolTip('Reload the OCR languages in the background after this long without a capture,\n'
+                                      'so the next capture is as fast as the rest')
+        self.warmUpSpinBox.setValue(currentSettings['warmUpIdle'])
+        self.warmUpSpinBox.valueChanged.connect(self.warmUpChanged)
+
+        self.presetLabel = QtWidgets.QLabel('OCR Preset')
+        self.presetCombo = QtWidgets.QComboBox(self)
+        for i, (setting, name) in enumerate((('fast', 'Fast'),
+                                             ('balanced', 'Balanced'),
+                                             ('accurate', 'Accurate'))):
+            self.presetCombo.addItem(name)
+            self.presetCombo.setItemData(i, setting)
+        self.presetCombo.setToolTip('Fast reads one image filter with the fast models, Accurate reads every filter\n'
+                                    'with the best models and may take much longer')
+        self.presetCombo.setCurrentIndex(self.presetCombo.findData(currentSettings['preset']))
+        self.presetCombo.currentIndexChanged.connect(self.presetChanged)
+
+        self.liveLabel = QtWidgets.QLabel('Translate While Typing')
+        self.liveCheckBox = QtWidgets.QCheckBox(self)
+        self.liveCheckBox.setToolTip('Translate the changed lines once typing pauses, without pressing Enter.\n'
+                                     'Takes effect in new translation windows')
+        self.liveCheckBox.setChecked(currentSettings['liveTranslation'])
+        self.liveCheckBox.toggled.connect(self.liveChanged)
+
+        self.cacheLabel = QtWidgets.QLabel('Translation Cache')
+        self.clearCacheButton = QtWidgets.QPushButton('Clear', self)
+        self.clearCacheButton.pressed.connect(self.clearTranslationCache)
+        self.updateCacheStats()
+
         self.gridLayout.addWidget(self.sourceLabel, 0, 0)
         self.gridLayout.addWidget(self.sourceLanguageCombo, 0, 1)
         self.gridLayout.addWidget(self.destinationLabel, 1, 0)
@@ -181,6 +263,22 @@ class PreferenceDialog(shortcutEditor):
         self.gridLayout.addWidget(QtWidgets.QWidget(), 2, 0)
         self.gridLayout.addWidget(self.pathLabel, 3, 0)
         self.gridLayout.addWidget(self.pathLineEdit, 3, 1)
+        self.gridLayout.addWidget(self.confidenceLabel, 4, 0)
+        self.gridLayout.addWidget(self.confidenceSpinBox, 4, 1)
+        self.gridLayout.addWidget(self.psmLabel, 5, 0)
+        self.gridLayout.addWidget(self.psmCombo, 5, 1)
+        self.gridLayout.addWidget(self.processesLabel, 6, 0)
+        self.gridLayout.addWidget(self.processesSpinBox, 6, 1)
+        self.gridLayout.addWidget(self.timeoutLabel, 7, 0)
+        self.gridLayout.addWidget(self.timeoutSpinBox, 7, 1)
+        self.gridLayout.addWidget(self.warmUpLabel, 8, 0)
+        self.gridLayout.addWidget(self.warmUpSpinBox, 8, 1)
+        self.gridLayout.addWidget(self.presetLabel, 9, 0)
+        self.gridLayout.addWidget(self.presetCombo, 9, 1)
+        self.gridLayout.addWidget(self.cacheLabel, 10, 0)
+        self.gridLayout.addWidget(self.clearCacheButton, 10, 1)
+        self.gridLayout.addWidget(self.liveLabel, 11, 0)
+        self.gridLayout.addWidget(self.liveCheckBox, 11, 1)
 
         self.move(self.pos() + (QtGui.QGuiApplication.primaryScreen().geometry().center() - self.geometry().center()))
 
@@ -201,6 +299,13 @@ class PreferenceDialog(shortcutEditor):
         for source in self.settingsDB.get_setting('imsource'):
             self.insertionDialog.tryInsert(source)
         self.pathLineEdit.tryToSetPath(self.settingsDB.get_setting('saves'))
+        self.confidenceSpinBox.setValue(self.settingsDB.get_setting('confidenceThreshold'))
+        self.psmCombo.setCurrentIndex(self.psmCombo.findData(self.settingsDB.get_setting('psm')))
+        self.processesSpinBox.setValue(self.settingsDB.get_setting('ocrProcesses'))
+        self.timeoutSpinBox.setValue(self.settingsDB.get_setting('ocrTimeout'))
+        self.warmUpSpinBox.setValue(self.settingsDB.get_setting('warmUpIdle'))
+        self.presetCombo.setCurrentIndex(self.presetCombo.findData(self.settingsDB.get_setting('preset')))
+        self.liveCheckBox.setChecked(self.settingsDB.get_setting('liveTranslation'))
 
     def insertionDialogCleared(self):
         self.settingsDB.update_setting('imsource', [])
@@ -226,6 +331,36 @@ class PreferenceDialog(shortcutEditor):
     def destinationChanged(self, index):
         self.settingsDB.update_setting('dest', self.destinationLanguageCombo.itemData(index))
 
+    def confidenceChanged(self, value):
+        self.settingsDB.update_setting('confidenceThreshold', value)
+
+    def psmChanged(self, index):
+        self.settingsDB.update_setting('psm', self.psmCombo.itemData(index))
+
+    def processesChanged(self, value):
+        self.settingsDB.update_setting('ocrProcesses', value)
+
+    def timeoutChanged(self, value):
+        self.settingsDB.update_setting('ocrTimeout', value)
+
+    def warmUpChanged(self, value):
+        self.settingsDB.update_setting('warmUpIdle', value)
+
+    def presetChanged(self, index):
+        self.settingsDB.update_setting('preset', self.presetCombo.itemData(index))
+
+    def liveChanged(self, checked):
+        self.settingsDB.update_setting('liveTranslation', checked)
+
+    def updateCacheStats(self):
+        stats = translationCache.stats()
+        self.clearCacheButton.setToolTip(f"Forget the {stats['entries']} saved translations.\n"
+                                         f"{stats['hitRate']:.0%} of the translations since launch were saved ones")
+
+    def clearTranslationCache(self):
+        translationCache.clear()
+        self.updateCacheStats()
+
     def unSaveSettings(self):
         self.settingsDB.rollback()
         super(PreferenceDialog, self).unSaveSettings()
@@ -233,6 +368,8 @@ class PreferenceDialog(shortcutEditor):
     def long_save_changes(self):
         super(PreferenceDialog, self).long_save_changes()
         self.settingsDB.save_changes()
+        # the OCR languages may have changed, warm up the new ones
+        warmUpOCR(self.settingsDB.get_settings())
         self.settingsDB.close()
         self.actionsChanged.emit()
 
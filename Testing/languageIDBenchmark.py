@@ -0,0 +1,189 @@
+"""
+Accuracy and latency of the local language identifier (TranslationWindow.LanguageID)
+on held out text with OCR-like noise: confused and dropped characters, lost
+diacritics, broken and merged words and stray punctuation.
+It also counts the requests detectedTranslation makes for every text and
+destination compared to always translating from 'auto' first, and how often
+the identifier would have sent a text in the wrong direction.
+
+run from the repository root:
+    python -m Testing.languageIDBenchmark
+    python -m Testing.languageIDBenchmark --noise 0 .05 .15 --destinations he en
+"""
+import argparse
+import random
+import statistics
+import time
+import unicodedata
+from TranslationWindow.LanguageID import LanguageIdentifier, normalizeCode
+
+HELD_OUT = {
+    'en': ['Are you sure you want to delete this item?', 'Connection lost. Trying to reconnect',
+           'Press any key to start', 'The meeting was moved to next Thursday afternoon',
+           'Remember me on this computer', 'Sorry, we could not find the page you were looking for'],
+    'es': ['¿Está seguro de que desea eliminar este elemento?', 'Se perdió la conexión. Intentando reconectar',
+           'Pulse cualquier tecla para comenzar', 'La reunión se cambió al próximo jueves por la tarde',
+           'Recordarme en este equipo', 'Lo sentimos, no pudimos encontrar la página que buscaba'],
+    'fr': ['Êtes-vous sûr de vouloir supprimer cet élément ?', 'Connexion perdue. Tentative de reconnexion',
+           'Appuyez sur une touche pour commencer', 'La réunion a été déplacée à jeudi prochain après-midi',
+           'Se souvenir de moi sur cet ordinateur', "Désolé, nous n'avons pas trouvé la page que vous cherchiez"],
+    'de': ['Möchten Sie dieses Element wirklich löschen?', 'Verbindung verloren. Erneuter Verbindungsversuch',
+           'Drücken Sie eine beliebige Taste, um zu beginnen', 'Das Treffen wurde auf nächsten Donnerstag verschoben',
+           'Auf diesem Computer angemeldet bleiben', 'Leider konnten wir die gesuchte Seite nicht finden'],
+    'it': ['Sei sicuro di voler eliminare questo elemento?', 'Connessione persa. Tentativo di riconnessione',
+           'Premi un tasto qualsiasi per iniziare', 'La riunione è stata spostata a giovedì prossimo pomeriggio',
+           'Ricordami su questo computer', 'Spiacenti, non siamo riusciti a trovare la pagina che cercavi'],
+    'pt': ['Tem certeza de que deseja excluir este item?', 'Conexão perdida. Tentando reconectar',
+           'Pressione qualquer tecla para começar', 'A reunião foi transferida para a próxima quinta-feira',
+           'Lembrar de mim neste computador', 'Desculpe, não conseguimos encontrar a página que você procurava'],
+    'nl': ['Weet u zeker dat u dit item wilt verwijderen?', 'Verbinding verbroken. Opnieuw verbinden',
+           'Druk op een toets om te beginnen', 'De vergadering is verplaatst naar volgende donderdagmiddag',
+           'Onthoud mij op deze computer', 'Sorry, we konden de pagina die u zocht niet vinden'],
+    'pl': ['Czy na pewno chcesz usunąć ten element?', 'Utracono połączenie. Próba ponownego połączenia',
+           'Naciśnij dowolny klawisz, aby rozpocząć', 'Spotkanie zostało przeniesione na przyszły czwartek',
+           'Zapamiętaj mnie na tym komputerze', 'Przepraszamy, nie znaleźliśmy strony, której szukasz'],
+    'tr': ['Bu öğeyi silmek istediğinizden emin misiniz?', 'Bağlantı kesildi. Yeniden bağlanılıyor',
+           'Başlamak için herhangi bir tuşa basın', 'Toplantı gelecek perşembe öğleden sonraya ertelendi',
+           'Bu bilgisayarda beni hatırla', 'Üzgünüz, aradığınız sayfayı bulamadık'],
+    'ru': ['Вы уверены, что хотите удалить этот элемент?', 'Соединение потеряно. Попытка переподключения',
+           'Нажмите любую клавишу, чтобы начать', 'Встреча перенесена на следующий четверг',
+           'Запомнить меня на этом компьютере', 'К сожалению, мы не нашли страницу, которую вы искали'],
+    'uk': ['Ви впевнені, що хочете видалити цей елемент?', "З'єднання втрачено. Спроба повторного підключення",
+           'Натисніть будь-яку клавішу, щоб почати', 'Зустріч перенесено на наступний четвер',
+           "Запам'ятати мене на цьому комп'ютері", 'На жаль, ми не знайшли сторінку, яку ви шукали'],
+    'ar': ['هل أنت متأكد أنك تريد حذف هذا العنصر؟', 'انقطع الاتصال. جار محاولة إعادة الاتصال',
+           'اضغط على أي مفتاح للبدء', 'تم نقل الاجتماع إلى يوم الخميس القادم',
+           'تذكرني على هذا الحاسوب', 'عذرا، لم نتمكن من العثور على الصفحة التي تبحث عنها'],
+    'fa': ['آیا مطمئن هستید که می‌خواهید این مورد را حذف کنید؟', 'اتصال قطع شد. در حال اتصال دوباره',
+           'برای شروع یک کلید را فشار دهید', 'جلسه به پنجشنبه آینده منتقل شد',
+           'مرا در این رایانه به خاطر بسپار', 'متاسفیم، صفحه‌ای را که دنبالش بودید پیدا نکردیم'],
+    'he': ['האם אתה בטוח שברצונך למחוק את הפריט הזה?', 'החיבור אבד. מנסה להתחבר מחדש',
+           'לחץ על מקש כלשהו כדי להתחיל', 'הפגישה הועברה ליום חמישי הבא אחר הצהריים',
+           'זכור אותי במחשב הזה', 'מצטערים, לא מצאנו את הדף שחיפשת'],
+    'yi': ['ביסטו זיכער אַז דו ווילסט אויסמעקן דעם חפֿץ?', 'די פֿאַרבינדונג איז פֿאַרלוירן געוואָרן',
+           'דריקט אויף אַ קנעפּל כּדי אָנצוהייבן', 'די זיצונג איז אַריבערגעפֿירט געוואָרן אויף קומענדיקן דאָנערשטיק',
+           'געדענק מיך אויף דעם קאָמפּיוטער', 'אַנטשולדיקט, מיר האָבן נישט געפֿונען דעם בלאַט וואָס איר זוכט'],
+    'zh': ['您确定要删除此项目吗？', '连接已断开，正在尝试重新连接', '按任意键开始',
+           '会议改到下周四下午了', '在这台电脑上记住我', '抱歉，我们找不到您要找的页面'],
+    'yue': ['你肯定要刪咗呢樣嘢？', '斷咗線，而家試緊重新連接', '撳任何一個掣就開始',
+            '個會改咗去下個禮拜四下晝', '喺呢部電腦記住我', '唔好意思，我哋搵唔到你要嘅嗰一頁'],
+    'ja': ['この項目を削除してもよろしいですか？', '接続が切れました。再接続しています', '何かキーを押して開始',
+           '会議は来週の木曜日の午後に変更されました', 'このコンピューターに記憶する', 'お探しのページが見つかりませんでした'],
+    'ko': ['이 항목을 삭제하시겠습니까?', '연결이 끊어졌습니다. 다시 연결하는 중', '시작하려면 아무 키나 누르세요',
+           '회의가 다음 주 목요일 오후로 옮겨졌습니다', '이 컴퓨터에서 로그인 상태 유지', '죄송합니다. 찾으시는 페이지가 없습니다'],
+    'el': ['Είστε σίγουροι ότι θέλετε να διαγράψετε αυτό το στοιχείο;', 'Η σύνδεση χάθηκε',
+           'Πατήστε οποιοδήποτε πλήκτρο για να ξεκινήσετε'],
+    # languages without a profile, they must not be taken for a destination that shares their script
+    'sv': ['Är du säker på att du vill ta bort det här objektet?', 'Anslutningen bröts. Försöker ansluta igen',
+           'Tryck på valfri tangent för att börja', 'Kom ihåg mig på den här datorn'],
+    'id': ['Apakah Anda yakin ingin menghapus item ini?', 'Koneksi terputus. Mencoba menghubungkan kembali',
+           'Tekan sembarang tombol untuk memulai', 'Ingat saya di komputer ini'],
+    'tl': ['Sigurado ka bang gusto mong burahin ang item na ito?', 'Nawala ang koneksyon. Sinusubukang kumonekta',
+           'Pindutin ang anumang key upang magsimula', 'Tandaan ako sa computer na ito'],
+    'cs': ['Opravdu chcete tuto položku smazat?', 'Spojení bylo ztraceno. Probíhá pokus o připojení',
+           'Stiskněte libovolnou klávesu pro spuštění', 'Zapamatovat si mě na tomto počítači'],
+    'ur': ['کیا آپ واقعی یہ آئٹم حذف کرنا چاہتے ہیں؟', 'رابطہ منقطع ہو گیا۔ دوبارہ جوڑنے کی کوشش',
+           'شروع کرنے کے لیے کوئی بھی کلید دبائیں', 'مجھے اس کمپیوٹر پر یاد رکھیں'],
+}
+# characters tesseract confuses
+CONFUSIONS = {'l': '1I|', 'i': 'l1!', 'o': '0', 'e': 'c', 'a': 'o', 's': '5', 'b': '6', 'g': '9', 'rn': 'm',
+              'm': 'rn', 'u': 'v', 'c': 'e', 'ו': 'ן', 'ה': 'ח', 'ר': 'ד', 'ב': 'כ', 'о': '0', 'е': 'с',
+              'и': 'н', 'ш': 'щ'}
+
+
+def noisy(text, rate, rng):
+    """OCR-like corruption of rate of the characters of text"""
+    if not rate:
+        return text
+    out = []
+    i = 0
+    while i < len(text):
+        pair, character = text[i:i + 2], text[i]
+        r = rng.random()
+        if r >= rate:
+            out.append(character)
+        elif pair in CONFUSIONS and r < rate / 3:
+            out.append(rng.choice(CONFUSIONS[pair]))
+            i += 1
+        elif character.lower() in CONFUSIONS and r < rate / 2:
+            out.append(rng.choice(CONFUSIONS[character.lower()]))
+        elif character == ' ':
+            out.append(rng.choice(['', '  ', ' . ']))  # merged words, debris
+        elif r < rate * .7:
+            out.append(unicodedata.normalize('NFD', character)[0])  # lost diacritic
+        elif r < rate * .85:
+            out.append(character + rng.choice(" .,'|"))  # broken word
+        # else the character is dropped
+        i += 1
+    return ''.join(out)
+
+
+def languages():
+    try:
+        from googletrans import LANGUAGES
+        return list(LANGUAGES)
+    except ModuleNotFoundError:
+        print('googletrans is not installed, only the benchmarked languages are candidates\n')
+        return list(HELD_OUT)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--noise', nargs='*', type=float, default=[0, .05, .1, .2],
+                        help='shares of corrupted characters')
+    parser.add_argument('--destinations', nargs='*', default=['he', 'en'], help='translation destinations')
+    parser.add_argument('--copies', type=int, default=5, help='noisy copies of every text')
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+
+    start = time.perf_counter()
+    identifier = LanguageIdentifier(languages())
+    print(f'profiles loaded in {(time.perf_counter() - start) * 1000:.1f}ms\n')
+    rng = random.Random(arguments.seed)
+
+    print(f'{"noise":>5} {"accuracy":>8} {"unsure":>6} {"mean µs":>8} {"p95 µs":>7}  '
+          f'{"requests old→new":>16} {"wrong direction":>15}  mistakes')
+    for rate in arguments.noise:
+        correct = unsure = 0
+        latencies = []
+        mistakes = {}
+        oldRequests = newRequests = wrongDirection = 0
+        texts = [(language, noisy(text, rate, rng)) for language, texts in HELD_OUT.items()
+                 for text in texts for _ in range(arguments.copies)]
+        for language, text in texts:
+            t = time.perf_counter()
+            guess, confidence = identifier.identify(text)
+            latencies.append((time.perf_counter() - t) * 1e6)
+            if guess is None:
+                unsure += 1
+            elif guess == language:
+                correct += 1
+            else:
+                mistakes[f'{language}→{guess}'] = mistakes.get(f'{language}→{guess}', 0) + 1
+
+            for destination in arguments.destinations:
+                inDestination = language == normalizeCode(destination)
+                oldRequests += 2 if inDestination else 1
+                decision = identifier.isLanguage(text, destination)
+                if decision is None:
+                    newRequests += 2 if inDestination else 1
+                elif decision:
+                    newRequests += 1
+                    wrongDirection += not inDestination
+                else:
+                    newRequests += 2 if inDestination else 1  # the service still says it is in destination
+        decided = len(texts) - unsure
+        worst = ', '.join(f'{mistake} {count}' for mistake, count in
+                          sorted(mistakes.items(), key=lambda item: -item[1])[:4])
+        print(f'{rate:>5.2f} {correct / decided if decided else 0:>8.1%} {unsure / len(texts):>6.1%} '
+              f'{statistics.mean(latencies):>8.1f} {percentile(latencies, .95):>7.1f}  '
+              f'{oldRequests:>7} → {newRequests:<6} {wrongDirection:>15}  {worst}')
+
+
+if __name__ == '__main__':
+    main()
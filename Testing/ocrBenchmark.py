@@ -0,0 +1,364 @@
+"""
+OCR latency and accuracy benchmark.
+
+Renders a deterministic corpus of UI-like text offline with PIL, in several
+fonts, sizes and polarities and in the languages that have a traineddata file,
+reads every image with the OCR half of TranslateFromImage (OCRRequest) and
+writes per stage wall time, CPU time, peak RSS and character error rate to a
+JSON report. Two reports can be compared to see what a change did.
+
+run from the repository root:
+    python -m Testing.ocrBenchmark --output before.json
+    python -m Testing.ocrBenchmark --output after.json --compare before.json
+the presets are compared the same way:
+    python -m Testing.ocrBenchmark --preset fast --output fast.json --compare before.json
+or all at once, into a report per preset (ocr_benchmark.fast.json, ...) and a table of their summaries:
+    python -m Testing.ocrBenchmark --preset fast balanced accurate --table Testing/presets.md
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+import numpy
+import cv2
+from TranslationWindow.Presets import PRESETS, DEFAULT
+from TranslationWindow.OCRPipeline import OCRRequest, VARIANTS, cpuTime
+from TranslationWindow.OCRCache import OCRCache
+from TranslationWindow.OCRScheduler import VariantScheduler
+from PIL import Image, ImageDraw, ImageFont, features
+import modded_pytesseract as tess
+
+TESSERACT = os.path.join('tesseract2', 'tesseract.exe')
+TESSDATA = os.path.join('tesseract2', 'tessdata')
+
+SAMPLES = {
+    'eng': ['File  Edit  View  Help', 'Save changes before closing?', 'Username or email address',
+            'Download complete: 3 files (12.4 MB)', 'The quick brown fox jumps over the lazy dog'],
+    'deu': ['Einstellungen speichern', 'Möchten Sie die Änderungen übernehmen?', 'Größe: 24 Punkte'],
+    'fra': ['Paramètres avancés', 'Voulez-vous vraiment quitter ?', 'Dernière mise à jour : hier'],
+    'spa': ['Configuración de la cuenta', '¿Desea guardar los cambios?', 'Año nuevo, contraseña nueva'],
+    'rus': ['Сохранить изменения', 'Введите имя пользователя', 'Загрузка завершена'],
+    'ell': ['Αποθήκευση αλλαγών', 'Όνομα χρήστη', 'Ρυθμίσεις λογαριασμού'],
+    'heb': ['שמור שינויים', 'שם משתמש או כתובת דואר', 'ההורדה הושלמה'],
+    'ara': ['حفظ التغييرات', 'اسم المستخدم', 'اكتمل التنزيل'],
+    'chi_sim': ['保存更改', '用户名或电子邮件', '下载完成'],
+    'jpn': ['変更を保存しますか', 'ユーザー名', 'ダウンロードが完了しました'],
+    'hin': ['परिवर्तन सहेजें', 'उपयोगकर्ता नाम', 'डाउनलोड पूरा हुआ'],
+}
+RIGHT_TO_LEFT = {'heb', 'ara'}
+# scripts that can't be drawn without complex text layout (libraqm)
+SHAPED = {'ara', 'hin'}
+
+LATIN_FONTS = ['arial.ttf', 'segoeui.ttf', 'tahoma.ttf', 'times.ttf', 'consola.ttf',
+               'DejaVuSans.ttf', 'DejaVuSerif.ttf', 'LiberationSans-Regular.ttf', 'LiberationMono-Regular.ttf']
+FONTS = {
+    'heb': ['arial.ttf', 'segoeui.ttf', 'tahoma.ttf', 'DejaVuSans.ttf'],
+    'ara': ['arial.ttf', 'segoeui.ttf', 'tahoma.ttf', 'DejaVuSans.ttf'],
+    'chi_sim': ['msyh.ttc', 'simsun.ttc', 'NotoSansCJK-Regular.ttc'],
+    'jpn': ['msgothic.ttc', 'YuGothM.ttc', 'NotoSansCJK-Regular.ttc'],
+    'hin': ['Nirmala.ttf', 'mangal.ttf', 'NotoSansDevanagari-Regular.ttf'],
+}
+SIZES = [11, 14, 20, 32]
+# (background, text) colors
+POLARITIES = {
+    'light': ((240, 240, 240), (20, 20, 20)),
+    'dark': ((32, 33, 36), (230, 230, 230)),
+}
+STAGES = ['cache', 'resize', 'binarize', 'languages', 'layout', 'recognize']
+
+
+def fontDirectories():
+    directories = [os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Fonts'),
+                   '/usr/share/fonts', '/usr/local/share/fonts', os.path.expanduser('~/.fonts'),
+                   '/Library/Fonts', '/System/Library/Fonts']
+    return [directory for directory in directories if os.path.isdir(directory)]
+
+
+def findFonts():
+    """{lower case file name: path} of the installed fonts"""
+    fonts = {}
+    for directory in fontDirectories():
+        for root, _, files in os.walk(directory):
+            for name in files:
+                fonts.setdefault(name.lower(), os.path.join(root, name))
+    return fonts
+
+
+def availableLanguages():
+    return {name[:-len('.traineddata')] for name in os.listdir(TESSDATA) if name.endswith('.traineddata')}
+
+
+def render(text, fontPath, size, polarity, lang):
+    """draws text like a UI label and returns it as the BGRA mat a capture is"""
+    background, color = POLARITIES[polarity]
+    font = ImageFont.truetype(fontPath, size)
+    if lang in RIGHT_TO_LEFT and not features.check('raqm'):
+        text = text[::-1]  # without libraqm text is laid out left to right
+    left, top, right, bottom = font.getbbox(text)
+    padding = size
+    image = Image.new('RGB', (right - left + padding * 2, bottom - top + padding * 2), background)
+    ImageDraw.Draw(image).text((padding - left, padding - top), text, font=font, fill=color)
+    return cv2.cvtColor(numpy.asarray(image), cv2.COLOR_RGB2BGRA)
+
+
+def corpus(seed=0, languages=None, sizes=SIZES, samplesPerLanguage=2):
+    """the same list of {id, lang, font, size, polarity, text, image} for the same arguments and installed fonts"""
+    rand = random.Random(seed)
+    installed = findFonts()
+    available = availableLanguages()
+    skipped = []
+    samples = []
+    for lang in sorted(SAMPLES):
+        if languages and lang not in languages:
+            continue
+        if lang not in available:
+            skipped.append((lang, 'no traineddata'))
+            continue
+        if lang in SHAPED and not features.check('raqm'):
+            skipped.append((lang, 'PIL has no libraqm to shape the script'))
+            continue
+        fonts = [installed[name.lower()] for name in FONTS.get(lang, LATIN_FONTS) if name.lower() in installed]
+        if not fonts:
+            skipped.append((lang, 'no font installed'))
+            continue
+        texts = rand.sample(SAMPLES[lang], min(samplesPerLanguage, len(SAMPLES[lang])))
+        for text in texts:
+            for size in sizes:
+                for polarity in POLARITIES:
+                    font = rand.choice(fonts)
+                    samples.append({
+                        'id': f'{lang}-{len(samples)}',
+                        'lang': lang,
+                        'font': os.path.basename(font),
+                        'size': size,
+                        'polarity': polarity,
+                        'text': text,
+                        'image': render(text, font, size, polarity, lang),
+                    })
+    return samples, skipped
+
+
+def normalize(text):
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def editDistance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def characterErrorRate(reference, hypothesis):
+    reference, hypothesis = normalize(reference), normalize(hypothesis)
+    return editDistance(reference, hypothesis) / max(len(reference), 1)
+
+
+def peakRSS():
+    """peak resident memory in bytes of this process and of its waited for children, None where unknown"""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+            return {'self': psutil.Process().memory_info().peak_wset, 'children': None}
+        except (ImportError, AttributeError):
+            return {'self': None, 'children': None}
+    unit = 1 if sys.platform == 'darwin' else 1024
+    return {'self': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit,
+            'children': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit}
+
+
+def summarize(values):
+    values = [value for value in values if value is not None]
+    if not values:
+        return None
+    return {'mean': statistics.mean(values), 'median': statistics.median(values), 'max': max(values)}
+
+
+def run(samples, imsource=None, psm='auto', threshold=None, repeat=1, preset=DEFAULT):
+    with tempfile.TemporaryDirectory() as directory:
+        # the variants are ordered and recorded like in the app, but data\ocr_stats.db isn't touched
+        scheduler = VariantScheduler(statsPath=os.path.join(directory, 'ocr_stats.db'))
+        try:
+            return readSamples(samples, scheduler, imsource, psm, threshold, repeat, preset)
+        finally:
+            scheduler.stats.close()
+
+
+def readSamples(samples, scheduler, imsource, psm, threshold, repeat, preset):
+    results = []
+    for sample in samples:
+        lang = imsource or ('+'.join(dict.fromkeys((sample['lang'], 'eng'))))
+        for attempt in range(repeat):
+            # a fresh in memory cache, every run reads the image for real
+            request = OCRRequest(sample['image'], lang, psm, threshold, preset=preset,
+                                 order=scheduler.order(VARIANTS), cache=OCRCache())
+            wall, cpu = time.perf_counter(), cpuTime()
+            try:
+                text, error = request.run(), None
+                scheduler.record(request.winner, request.tried)
+            except Exception as e:
+                text, error = '', repr(e)
+            results.append({
+                'id': sample['id'],
+                'attempt': attempt,
+                'lang': sample['lang'],
+                'ocrLanguages': request.lang,
+                'font': sample['font'],
+                'size': sample['size'],
+                'polarity': sample['polarity'],
+                'reference': sample['text'],
+                'text': text,
+                'error': error,
+                'cer': characterErrorRate(sample['text'], text),
+                'scale': request.scale,
+                'wall': time.perf_counter() - wall,
+                'cpu': cpuTime() - cpu,
+                'stages': {stage: {'wall': stageWall, 'cpu': stageCpu}
+                           for stage, (stageWall, stageCpu) in request.timings.items()},
+                'peakRSS': peakRSS(),
+            })
+    return results
+
+
+def report(results, skipped, arguments):
+    rss = [result['peakRSS'] for result in results]
+    return {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'tesseract': str(tess.get_tesseract_version()),
+        'arguments': arguments,
+        'skipped': [{'lang': lang, 'reason': reason} for lang, reason in skipped],
+        'summary': {
+            'samples': len(results),
+            'errors': sum(result['error'] is not None for result in results),
+            'cer': summarize([result['cer'] for result in results]),
+            'wall': summarize([result['wall'] for result in results]),
+            'cpu': summarize([result['cpu'] for result in results]),
+            'stages': {stage: {'wall': summarize([result['stages'].get(stage, {}).get('wall') for result in results]),
+                               'cpu': summarize([result['stages'].get(stage, {}).get('cpu') for result in results])}
+                       for stage in STAGES},
+            'peakRSS': {'self': max((r['self'] for r in rss if r['self'] is not None), default=None),
+                        'children': max((r['children'] for r in rss if r['children'] is not None), default=None)},
+            'byLanguage': {lang: {'cer': summarize([r['cer'] for r in results if r['lang'] == lang]),
+                                  'wall': summarize([r['wall'] for r in results if r['lang'] == lang])}
+                           for lang in sorted({result['lang'] for result in results})},
+        },
+        'results': results,
+    }
+
+
+def compare(old, new):
+    """prints how the summary of the new report differs from the old one"""
+    def line(name, before, after, unit=''):
+        if before is None or after is None:
+            print(f'{name:<28}{"-":>12}{"-":>12}')
+            return
+        change = (after - before) / before * 100 if before else 0
+        print(f'{name:<28}{before:>12.4f}{after:>12.4f}{unit:>3}{change:>+9.1f}%')
+
+    oldSummary, newSummary = old['summary'], new['summary']
+    print(f'{"":<28}{"before":>12}{"after":>12}')
+    line('CER (mean)', oldSummary['cer'] and oldSummary['cer']['mean'], newSummary['cer'] and newSummary['cer']['mean'])
+    for key in ('wall', 'cpu'):
+        line(f'{key} (median)', oldSummary[key] and oldSummary[key]['median'],
+             newSummary[key] and newSummary[key]['median'], 's')
+    for stage in STAGES:
+        before, after = oldSummary['stages'][stage]['wall'], newSummary['stages'][stage]['wall']
+        line(f'  {stage} wall (median)', before and before['median'], after and after['median'], 's')
+    for key in ('self', 'children'):
+        before, after = oldSummary['peakRSS'][key], newSummary['peakRSS'][key]
+        line(f'peak RSS {key} (MB)', before and before / 2 ** 20, after and after / 2 ** 20)
+
+
+def table(reports):
+    """a markdown table of the summaries of {preset: report}"""
+    def median(summary):
+        return '-' if summary is None else f"{summary['median']:.3f}"
+
+    # peak RSS is left out, it is the peak of the whole process and so of every preset before
+    lines = ['| preset | samples | errors | CER (mean) | wall (median s) | cpu (median s) | recognize (median s) |',
+             '|---|---|---|---|---|---|---|']
+    for preset, presetReport in reports.items():
+        summary = presetReport['summary']
+        lines.append(f"| {preset} | {summary['samples']} | {summary['errors']} "
+                     f"| {'-' if summary['cer'] is None else format(summary['cer']['mean'], '.4f')} "
+                     f"| {median(summary['wall'])} | {median(summary['cpu'])} "
+                     f"| {median(summary['stages']['recognize']['wall'])} |")
+    first = next(iter(reports.values()))
+    lines.append('')
+    lines.append(f"{first['platform']}, python {first['python']}, tesseract {first['tesseract']}, "
+                 f"{first['created']}")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default='ocr_benchmark.json', help='path of the JSON report')
+    parser.add_argument('--compare', help='a previous report to compare the new one to')
+    parser.add_argument('--languages', nargs='*', help='only render these languages')
+    parser.add_argument('--sizes', nargs='*', type=int, default=SIZES, help='font sizes in pixels')
+    parser.add_argument('--samples', type=int, default=2, help='texts per language')
+    parser.add_argument('--imsource', help="OCR language set for every image, e.g 'heb+ara+eng'. "
+                                           "default: the image's language and English")
+    parser.add_argument('--psm', default='auto', help='page segmentation mode setting')
+    parser.add_argument('--threshold', type=int, help='confidence that settles a capture')
+    parser.add_argument('--preset', nargs='+', default=[DEFAULT], choices=PRESETS,
+                        help='OCR pipelines, every one is benchmarked on the same images')
+    parser.add_argument('--repeat', type=int, default=1, help='times every image is read')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tesseract', help='tesseract executable, default: the bundled one')
+    parser.add_argument('--table', help='path of a markdown table of the summary of every preset')
+    arguments = parser.parse_args()
+
+    # set up like Translate does, without importing it: its clients, caches and stats files stay untouched
+    tess.modded_pytesseract.tesseract_cmd = arguments.tesseract or TESSERACT
+    pool = tess.TesseractPool()
+    tess.modded_pytesseract.worker_pool = pool if pool.available() else None
+    samples, skipped = corpus(arguments.seed, arguments.languages, arguments.sizes, arguments.samples)
+    for lang, reason in skipped:
+        print(f'skipping {lang}: {reason}')
+    print(f'reading {len(samples)} images')
+
+    reports = {}
+    for preset in arguments.preset:
+        results = run(samples, arguments.imsource, arguments.psm, arguments.threshold, arguments.repeat, preset)
+        newReport = reports[preset] = report(results, skipped, dict(vars(arguments), preset=preset))
+        output = arguments.output
+        if len(arguments.preset) > 1:
+            root, extension = os.path.splitext(output)
+            output = f'{root}.{preset}{extension}'
+        with open(output, 'w', encoding='utf-8') as file:
+            json.dump(newReport, file, indent=4, ensure_ascii=False)
+        print(f'{preset} report written to {output}')
+
+        if arguments.compare:
+            with open(arguments.compare, encoding='utf-8') as file:
+                compare(json.load(file), newReport)
+        elif results:
+            summary = newReport['summary']
+            # every sample of the preset may have failed, it has no CER then
+            print(f"CER {'-' if summary['cer'] is None else format(summary['cer']['mean'], '.4f')}, "
+                  f"median wall {'-' if summary['wall'] is None else format(summary['wall']['median'], '.3f')}s, "
+                  f"{summary['errors']} errors")
+
+    if arguments.table:
+        with open(arguments.table, 'w', encoding='utf-8') as file:
+            file.write(table(reports) + '\n')
+        print(f'table written to {arguments.table}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Runs the managed translation client against a local stand-in for the
+translation service that can be healthy, flaky, slow, down or dropping connections, and prints
+what the client did: connections opened, retries, circuit breaker state
+and the latency histogram.
+run from the repository root: python -m Testing.translationClientCheck
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from threading import Thread, Lock
+import json
+import time
+from TranslationWindow.HTTPClient import ManagedClient, CircuitOpen, OPEN, CLOSED
+
+
+class StandIn(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    mode = 'healthy'
+    lock = Lock()
+    requests = 0
+    connections = set()
+
+    def do_GET(self):
+        with StandIn.lock:
+            StandIn.requests += 1
+            StandIn.connections.add(self.client_address)
+            count = StandIn.requests
+        if self.mode == 'drop':
+            # what a server that drops a stale keep-alive connection looks like: no response at all
+            self.close_connection = True
+            return
+        if self.mode == 'slow':
+            time.sleep(1)
+        if self.mode == 'down' or (self.mode == 'flaky' and count % 2):
+            self.reply(503, b'unavailable')
+        else:
+            self.reply(200, json.dumps([[['shalom', 'hello']]]).encode())
+
+    def reply(self, status, body):
+        try:
+            self.send_response(status)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except ConnectionError:
+            pass  # the client gave up waiting
+
+    def log_message(self, *args):
+        pass
+
+
+def scenario(name, client, url, requests):
+    StandIn.mode = name
+    StandIn.requests = 0
+    StandIn.connections = set()
+    outcomes = {}
+    start = time.perf_counter()
+    for _ in range(requests):
+        try:
+            outcome = str(client.get(url, params={'q': 'hello'}).status_code)
+        except CircuitOpen:
+            outcome = 'circuit open'
+        except Exception as e:
+            outcome = type(e).__name__
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    seconds = time.perf_counter() - start
+    print(f'{name:<8} {seconds:6.2f}s  outcomes {outcomes}  server saw {StandIn.requests} requests '
+          f'on {len(StandIn.connections)} connections  circuit {client.breaker.state}')
+    return outcomes
+
+
+def main():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandIn)
+    Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/translate_a/single'
+    client = ManagedClient(connectTimeout=.5, readTimeout=.3, backoff=.05, resetTimeout=1)
+    try:
+        outcomes = scenario('healthy', client, url, 20)
+        assert outcomes == {'200': 20} and len(StandIn.connections) == 1, 'connections were not kept alive'
+
+        outcomes = scenario('flaky', client, url, 10)
+        assert outcomes == {'200': 10}, 'retries did not hide the failures'
+
+        outcomes = scenario('down', client, url, 10)
+        assert client.breaker.state == OPEN and outcomes.get('circuit open'), 'the circuit did not open'
+        assert StandIn.requests == client.breaker.failureThreshold * (client.retries + 1), \
+            'requests were made while the circuit was open'
+
+        time.sleep(client.breaker.resetTimeout)
+        outcomes = scenario('drop', client, url, 3)
+        assert outcomes.get('RemoteProtocolError') == 1 and client.breaker.state == OPEN, \
+            'a dropped connection left the trial half open'
+
+        time.sleep(client.breaker.resetTimeout)
+        outcomes = scenario('healthy', client, url, 5)
+        assert outcomes == {'200': 5} and client.breaker.state == CLOSED, 'the circuit did not close again'
+
+        scenario('slow', client, url, 2)
+        print(json.dumps(client.stats(), indent=4))
+    finally:
+        client.close()
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Times parsing tesseract's TSV output and averaging its confidences on a page
+of 10k words: the old file_to_dict + list walk against tsv_to_columns +
+mean_confidence. run from the repository root: python -m Testing.tsvParserBenchmark
+"""
+import random
+import sys
+import timeit
+from modded_pytesseract.modded_pytesseract import file_to_dict, tsv_to_columns, mean_confidence
+from modded_pytesseract.pool import TSV_HEADER
+
+
+def syntheticPage(words=10000, wordsPerLine=10, linesPerBlock=50, seed=0):
+    """TSV with the page, block, paragraph and line rows tesseract prints around the words"""
+    rand = random.Random(seed)
+    rows = [TSV_HEADER.strip(), '1\t1\t0\t0\t0\t0\t0\t0\t2000\t3000\t-1\t']
+    for i in range(words):
+        line, word = divmod(i, wordsPerLine)
+        block = line // linesPerBlock + 1
+        if not word:
+            if not line % linesPerBlock:
+                rows.append(f'2\t1\t{block}\t0\t0\t0\t40\t{line * 20}\t1900\t1000\t-1\t')
+                rows.append(f'3\t1\t{block}\t1\t0\t0\t40\t{line * 20}\t1900\t1000\t-1\t')
+            rows.append(f'4\t1\t{block}\t1\t{line + 1}\t0\t40\t{line * 20}\t1900\t18\t-1\t')
+        rows.append(f'5\t1\t{block}\t1\t{line + 1}\t{word + 1}\t{40 + word * 180}\t{line * 20}\t150\t18\t'
+                    f'{rand.uniform(20, 100):.6f}\t{"".join(rand.choices("abcdefghij", k=rand.randint(1, 9)))}')
+    return '\n'.join(rows)
+
+
+def oldAverage(data):
+    # the list walk TextRecognizer.getAverageConfidence used to do. confidences printed as floats stay strings
+    values = [float(conf) for conf in data['conf'] if not conf == '-1']
+    return sum(values) / len(values) if values else -1
+
+
+def main(repeat=20):
+    tsv = syntheticPage()
+    old = oldAverage(file_to_dict(tsv, '\t', -1))
+    new = mean_confidence(tsv_to_columns(tsv))
+    assert abs(old - new) < 1e-6, (old, new)
+
+    for name, statement in (('file_to_dict', lambda: file_to_dict(tsv, '\t', -1)),
+                            ('tsv_to_columns', lambda: tsv_to_columns(tsv)),
+                            ('file_to_dict + average', lambda: oldAverage(file_to_dict(tsv, '\t', -1))),
+                            ('tsv_to_columns + mean_confidence', lambda: mean_confidence(tsv_to_columns(tsv)))):
+        best = min(timeit.repeat(statement, number=1, repeat=repeat))
+        print(f'{name:<34}{best * 1000:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
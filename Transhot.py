@@ -1,7 +1,7 @@
 from PyQt5 import QtWidgets, QtCore, QtGui, QtPrintSupport
 from PyQt5.QtGui import QPainter
 from collections import namedtuple
-from TranslationWindow.Translate import openImage
+from TranslationWindow.Translate import openImage, startOCR
 from structures import QListener, TwoWayDict, Stack, EmptyStackException
 from TranslationWindow.TranslationWindow import TranslationWindow, SmallTranslation
 from SettingsDialog.SettingsDialog import PreferenceDialog
@@ -128,8 +128,15 @@ class Main(QtWidgets.QMainWindow):
         self.resetAction = create_shortcut(self, self.reset, 'Take A Screenshot', QtCore.Qt.Key_Print)
         self.hideAction = create_shortcut(self, self.hide, 'Hide', 'esc')
         self.copyAction = create_shortcut(self, self.copyImage, 'Copy To Clipboard', 'ctrl+c')
-        self.translateAction = create_shortcut(self, self.translate, 'Translate', 'ctrl+t')
-        self.softTranslation = create_shortcut(self, self.softTranslation, 'Quick Translation', 'ctrl+n')
+        # the translations take the preset by keyword, triggered's checked flag can't be taken for one
+        self.translateAction = create_shortcut(self, lambda: self.translate(), 'Translate', 'ctrl+t')
+        self.softTranslation = create_shortcut(self, lambda: Main.softTranslation(self), 'Quick Translation',
+                                               'ctrl+n')
+        self.accurateTranslateAction = create_shortcut(self, lambda: self.translate(preset='accurate'),
+                                                       'Accurate Translate', 'ctrl+shift+t')
+        # self.softTranslation is the action from here on
+        self.fastSoftTranslation = create_shortcut(self, lambda: Main.softTranslation(self, preset='fast'),
+                                                   'Fast Quick Translation', 'ctrl+shift+n')
         self.saveAction = create_shortcut(self, self.saveImage, 'Save', 'ctrl+s')
         self.quickSaveAction = create_shortcut(self, lambda: LongOperation(self.quickSave, self), 'quick save', 'ctrl+shift+s')
         self.saveOpenAction = create_shortcut(self, self.saveAndOpen, 'Save & Open', 'ctrl+r')
@@ -151,7 +158,14 @@ class Main(QtWidgets.QMainWindow):
             'dest': 'he',
             'source': 'auto',
             'imsource': [],
-            'saves': 'saves\\'
+            'saves': 'saves\\',
+            'confidenceThreshold': 85,
+            'psm': 'auto',
+            'ocrProcesses': 0,
+            'ocrTimeout': 15,
+            'warmUpIdle': 10,
+            'preset': 'balanced',
+            'liveTranslation': True
         }
         self.settingsDatabase = PreferenceDialog.initiateSettingsDatabase(self.defaultSettings)
 
@@ -163,6 +177,7 @@ class Main(QtWidgets.QMainWindow):
         if not os.path.isdir(self.settingsDatabase.get_setting('saves')):
             self.settingsDatabase.update_setting('saves', self.defaultSettings['saves'])
         self.settingsDatabase.save_changes()
+        startOCR(self.settingsDatabase.get_settings())
 
         self.defaultShortcuts = PreferenceDialog.windowActionsToDict(self)
 
@@ -456,25 +471,31 @@ class Main(QtWidgets.QMainWindow):
     def getCroppedScreenShot(self):
         return self.label.getCroppedScreenShot()
 
-    def translate(self):
-        if self.isHidden() or self.busy:
+    def ocrSettings(self, preset=None):
+        """the settings, with the OCR preset of a hotkey instead of the configured one"""
+        settings = self.settingsDatabase.get_settings()
+        if preset is not None:
+            settings['preset'] = preset
+        return settings
+
+    def translate(self, *, preset=None):
+        # OCR requests are independent of each other, several windows can translate at once
+        if self.isHidden():
             return
-        self.busy = True
         self.unsetCursor()
-        t = TranslationWindow(self.settingsDatabase.get_settings(), self, self.getCroppedScreenShot(), title=appName)
+        t = TranslationWindow(self.ocrSettings(preset), self, self.getCroppedScreenShot(), title=appName)
         self.hide()
-        t.exec_()
-        self.busy = False
+        t.show()
 
-    def softTranslation(self):
+    def softTranslation(self, *, preset=None):
         """Open a small window with the translated text in it.
         open progress widget
         get text with thread
         open small translation window
         """
-        if self.isHidden() or self.busy:
+        if self.isHidden():
             return
-        SmallTranslation(self.settingsDatabase.get_settings(), self.getCroppedScreenShot(), self)
+        SmallTranslation(self.ocrSettings(preset), self.getCroppedScreenShot(), self)
         self.hide()
 
     def closeEvent(self, event):
@@ -1022,7 +1043,9 @@ class SystemTrayIcon(QtWidgets.QSystemTrayIcon):
 
 if __name__ == '__main__':
     from PyQt5 import QtCore, QtWidgets
+    from multiprocessing import freeze_support
 
+    freeze_support()  # the OCR workers are started from the frozen executable as well
     lockfile = QtCore.QLockFile(QtCore.QDir.tempPath() + f'/{appName}.lock')
 
     if lockfile.tryLock(100):  # run only once!
@@ -0,0 +1,263 @@
+"""
+Translation backends and the router that picks one for every request.
+A backend is registered under its name with @register, BackendRouter tries
+the backends that support the language pair from the fastest healthy one.
+"""
+from abc import ABC, abstractmethod
+from threading import Lock
+import json
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# {name: TranslationBackend subclass}
+BACKENDS = {}
+
+
+def register(backend):
+    BACKENDS[backend.name] = backend
+    return backend
+
+
+class Translation:
+    """a translation with the attributes of googletrans' Translated"""
+
+    def __init__(self, src, dest, origin, text, pronunciation=None, backend=''):
+        self.src = src
+        self.dest = dest
+        self.origin = origin
+        self.text = text
+        self.pronunciation = pronunciation
+        self.backend = backend
+
+    def __repr__(self):
+        return f'Translation(src={self.src!r}, dest={self.dest!r}, text={self.text!r}, backend={self.backend!r})'
+
+
+class Unsupported(Exception):
+    """the backend can't translate this text. the router tries the next one without holding it against it"""
+
+
+class TranslationBackend(ABC):
+    name = ''
+
+    def supports(self, src, dest):
+        """whether the backend may be able to translate from src ('auto' included) to dest"""
+        return True
+
+    def warm(self):
+        """makes the next translation as fast as the rest, e.g by connecting to the service"""
+
+    @abstractmethod
+    def translate(self, text, dest, src):
+        """
+        :returns: Translation. the lines of text are translated into as many lines
+        raises Unsupported when the text can't be translated by this backend
+        """
+
+
+@register
+class GoogleBackend(TranslationBackend):
+    name = 'google'
+
+    def __init__(self, client=None, serviceUrl='translate.googleapis.com'):
+        """
+        :param client: HTTPClient.ManagedClient the translator sends its requests through
+        """
+        from googletrans import Translator
+        self.translator = Translator([serviceUrl])
+        if client is not None:
+            # googletrans requests through its httpx client. its headers are kept, the connections are the managed ones
+            client.headers.update(self.translator.client.headers)
+            self.translator.client = client
+            if hasattr(self.translator, 'token_acquirer'):
+                self.translator.token_acquirer.client = client
+
+    def warm(self):
+        self.translate('ok', 'en', 'auto')
+
+    def translate(self, text, dest, src):
+        t = self.translator.translate(text, dest=dest, src=src)
+        return Translation(t.src, t.dest, t.origin, t.text, t.pronunciation, self.name)
+
+
+@register
+class PhrasebookBackend(TranslationBackend):
+    """
+    Offline phrase-table translation of the short strings of menus, buttons and
+    dialogs. every line is covered greedily by the longest known phrases, a line
+    with a word that isn't in the table makes the whole text Unsupported.
+    """
+    name = 'phrasebook'
+    phrasebookPath = os.path.join('data', 'phrasebook.json')
+    PUNCTUATION = '.,:;!?…"\'()[]'
+    # words made of digits and symbols are kept as they are
+    UNTRANSLATED = re.compile(r'[\d\W_]+')
+
+    def __init__(self, path=phrasebookPath):
+        """
+        :param path: JSON file of the form {"pairs": {"en-he": {"save as": "שמור בשם", ...}}}.
+            the reverse of every pair is added when the file doesn't have it
+        """
+        with open(path, encoding='utf-8') as file:
+            pairs = json.load(file)['pairs']
+        # {(src, dest): {normalized phrase: translation}}
+        self.tables = {}
+        for pair, phrases in pairs.items():
+            src, dest = pair.split('-')
+            self.tables[(src, dest)] = {self.normalize(phrase): translation for phrase, translation in phrases.items()}
+        for (src, dest), table in list(self.tables.items()):
+            if (dest, src) not in self.tables:
+                self.tables[(dest, src)] = {self.normalize(translation): phrase.capitalize()
+                                            for phrase, translation in table.items()}
+        self.longest = {pair: max(map(len, map(str.split, table)), default=0) for pair, table in self.tables.items()}
+
+    @classmethod
+    def normalize(cls, phrase):
+        return ' '.join(word.strip(cls.PUNCTUATION).lower() for word in phrase.split())
+
+    def pairs(self, src, dest):
+        return [pair for pair in self.tables if pair[1] == dest and src in ('auto', pair[0])]
+
+    def supports(self, src, dest):
+        return bool(self.pairs(src, dest))
+
+    def translateLine(self, line, pair):
+        """the translation of a line, None when a word isn't known"""
+        table, longest = self.tables[pair], self.longest[pair]
+        words = line.split()
+        translated = []
+        i = 0
+        while i < len(words):
+            for n in range(min(longest, len(words) - i), 0, -1):
+                phrase = self.normalize(' '.join(words[i:i + n]))
+                if phrase in table:
+                    last = words[i + n - 1]
+                    translated.append(table[phrase] + last[len(last.rstrip(self.PUNCTUATION)):])
+                    i += n
+                    break
+            else:
+                if not self.UNTRANSLATED.fullmatch(words[i]):
+                    return None
+                translated.append(words[i])
+                i += 1
+        return ' '.join(translated)
+
+    def translate(self, text, dest, src):
+        for pair in self.pairs(src, dest):
+            lines = [self.translateLine(line, pair) for line in text.split('\n')]
+            if None not in lines:
+                return Translation(pair[0], dest, text, '\n'.join(lines), None, self.name)
+        raise Unsupported(f'not every phrase is in the {src}-{dest} phrasebook')
+
+
+@register
+class MockBackend(TranslationBackend):
+    """deterministic translations for tests: every line is prefixed by the destination language"""
+    name = 'mock'
+
+    def __init__(self, latency=0., fail=False, source='en'):
+        """
+        :param latency: seconds every translation takes
+        :param fail: raise ConnectionError instead of translating
+        :param source: the language 'auto' is detected as
+        """
+        self.latency = latency
+        self.fail = fail
+        self.source = source
+        self.calls = 0
+
+    def translate(self, text, dest, src):
+        self.calls += 1
+        time.sleep(self.latency)
+        if self.fail:
+            raise ConnectionError('mock backend failure')
+        return Translation(self.source if src == 'auto' else src, dest, text,
+                           '\n'.join(f'[{dest}] {line}' for line in text.split('\n')), None, self.name)
+
+
+class BackendRouter:
+    """
+    Tries the backends that support the language pair from the one with the
+    lowest measured latency for that pair. a backend that failed failureLimit
+    times in a row is unhealthy for a while and only tried after the healthy ones.
+    """
+
+    def __init__(self, backends, smoothing=.3, failureLimit=2, quarantine=60):
+        """
+        :param backends: TranslationBackend instances. ties keep this order
+        :param smoothing: weight of the newest latency in the running average
+        :param quarantine: seconds a backend stays unhealthy
+        """
+        self.backends = list(backends)
+        self.smoothing = smoothing
+        self.failureLimit = failureLimit
+        self.quarantine = quarantine
+        self.lock = Lock()
+        # {(backend name, src, dest): {'latency': seconds or None, 'failures': int, 'unhealthyUntil': float}}
+        self.health = {}
+
+    def record(self, backend, src, dest):
+        return self.health.setdefault((backend.name, src, dest),
+                                      {'latency': None, 'failures': 0, 'unhealthyUntil': 0.})
+
+    def order(self, src, dest):
+        """the backends supporting the pair, healthy ones first, each group by latency. unmeasured ones go first"""
+        now = time.monotonic()
+        with self.lock:
+            def key(item):
+                index, backend = item
+                record = self.record(backend, src, dest)
+                latency = record['latency']
+                return record['unhealthyUntil'] > now, latency is not None, latency or 0, index
+            candidates = [(i, backend) for i, backend in enumerate(self.backends) if backend.supports(src, dest)]
+            return [backend for _, backend in sorted(candidates, key=key)]
+
+    def succeeded(self, backend, src, dest, seconds):
+        with self.lock:
+            record = self.record(backend, src, dest)
+            latency = record['latency']
+            record['latency'] = seconds if latency is None else latency + self.smoothing * (seconds - latency)
+            record['failures'] = 0
+            record['unhealthyUntil'] = 0.
+
+    def failed(self, backend, src, dest):
+        with self.lock:
+            record = self.record(backend, src, dest)
+            record['failures'] += 1
+            if record['failures'] >= self.failureLimit:
+                record['unhealthyUntil'] = time.monotonic() + self.quarantine
+
+    def translate(self, text, dest, src):
+        """
+        :returns: Translation of the first backend that translated the text
+        raises the error of the last backend that failed, Unsupported when none could translate it
+        """
+        error = Unsupported(f'no translation backend for {src}-{dest}')
+        for backend in self.order(src, dest):
+            start = time.perf_counter()
+            try:
+                translation = backend.translate(text, dest, src)
+            except Unsupported as e:
+                if isinstance(error, Unsupported):
+                    error = e
+                continue
+            except Exception as e:
+                logger.info('%s failed to translate %s-%s: %r', backend.name, src, dest, e)
+                self.failed(backend, src, dest)
+                error = e
+                continue
+            self.succeeded(backend, src, dest, time.perf_counter() - start)
+            return translation
+        raise error
+
+    def warm(self):
+        for backend in self.backends:
+            backend.warm()
+
+    def stats(self):
+        with self.lock:
+            return {'-'.join(key): dict(record) for key, record in self.health.items()}
@@ -0,0 +1,220 @@
+"""
+A long lived HTTP client for the translation service: pooled keep-alive
+connections, separate connect and read timeouts, retries with exponential
+backoff and jitter, and a circuit breaker that fails fast while the
+service is down instead of waiting out a timeout on every request.
+"""
+from bisect import bisect_left
+from threading import Lock
+import logging
+import random
+import time
+import httpx
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half open'
+
+
+# connection, protocol and timeout errors. httpx 0.13, the version googletrans 3 pins, has no TransportError
+TRANSPORT_ERRORS = (httpx.TransportError,) if hasattr(httpx, 'TransportError') else \
+    (httpx.TimeoutException, httpx.NetworkError, httpx.ProtocolError)
+
+
+class CircuitOpen(Exception):
+    """raised without a request while the circuit breaker is open"""
+
+    def __init__(self, retryIn):
+        super(CircuitOpen, self).__init__(f'the translation service is failing, not retrying for {retryIn:.0f}s')
+        self.retryIn = retryIn
+
+
+class CircuitBreaker:
+    def __init__(self, failureThreshold=3, resetTimeout=30):
+        """
+        :param failureThreshold: consecutive failed requests that open the circuit
+        :param resetTimeout: seconds the circuit stays open before a single trial request is let through
+        """
+        self.failureThreshold = failureThreshold
+        self.resetTimeout = resetTimeout
+        self.state = CLOSED
+        self.failures = 0
+        self.openedAt = None
+        self.lock = Lock()
+
+    def check(self):
+        """raises CircuitOpen unless a request may be made now"""
+        with self.lock:
+            if self.state == CLOSED:
+                return
+            retryIn = self.openedAt + self.resetTimeout - time.monotonic()
+            if self.state == OPEN and retryIn <= 0:
+                # the next request is the trial, the ones made meanwhile still fail fast
+                self.state = HALF_OPEN
+                return
+            raise CircuitOpen(max(retryIn, 0))
+
+    def success(self):
+        with self.lock:
+            if self.state != CLOSED:
+                logger.info('translation service is back, circuit closed')
+            self.state = CLOSED
+            self.failures = 0
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failureThreshold:
+                if self.state != OPEN:
+                    logger.warning('translation service failed %d times, circuit opened for %ds', self.failures,
+                                   self.resetTimeout)
+                self.state = OPEN
+                self.openedAt = time.monotonic()
+
+
+class LatencyHistogram:
+    """counts request latencies into buckets of upper bounds in seconds, the last bucket is unbounded"""
+    BOUNDS = (.05, .1, .25, .5, 1, 2.5, 5, 10)
+
+    def __init__(self, bounds=BOUNDS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.
+        self.lock = Lock()
+
+    def record(self, seconds):
+        with self.lock:
+            self.counts[bisect_left(self.bounds, seconds)] += 1
+            self.total += seconds
+
+    def percentile(self, fraction):
+        """the upper bound of the bucket the fraction of requests falls in, inf for the last one"""
+        with self.lock:
+            wanted = fraction * sum(self.counts)
+            seen = 0
+            for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+                seen += count
+                if count and seen >= wanted:
+                    return bound
+            return None
+
+    def snapshot(self):
+        with self.lock:
+            count = sum(self.counts)
+            buckets = {f'<={bound}s': n for bound, n in zip(self.bounds, self.counts)}
+            buckets[f'>{self.bounds[-1]}s'] = self.counts[-1]
+            mean = self.total / count if count else None
+        return {'count': count, 'mean': mean, 'p50': self.percentile(.5), 'p95': self.percentile(.95),
+                'buckets': buckets}
+
+
+def clientOptions(connectTimeout, readTimeout, keepAlive, connections):
+    """
+    the httpx.Client arguments. httpx renamed them after 0.13, the version
+    googletrans 3 pins, whose idle connections expire on their own schedule
+    """
+    if hasattr(httpx, 'Limits'):
+        return {'timeout': httpx.Timeout(readTimeout, connect=connectTimeout),
+                'limits': httpx.Limits(max_connections=connections, max_keepalive_connections=connections,
+                                       keepalive_expiry=keepAlive)}
+    return {'timeout': httpx.Timeout(readTimeout, connect_timeout=connectTimeout),
+            'pool_limits': httpx.PoolLimits(soft_limit=connections, hard_limit=connections)}
+
+
+class ManagedClient:
+    """
+    Has the get/post interface of httpx.Client, so it can replace the client of
+    a library that makes its requests through one.
+    A request that can't connect, times out or gets 429/5xx is retried, the
+    breaker counts a request as failed once its retries are used up.
+    """
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(self, connectTimeout=3, readTimeout=5, retries=2, backoff=.25, maxBackoff=2, keepAlive=90,
+                 connections=4, failureThreshold=3, resetTimeout=30, headers=None):
+        """
+        :param connectTimeout: seconds to connect, TLS handshake included
+        :param readTimeout: seconds to wait for the response
+        :param retries: attempts after the first one
+        :param backoff: seconds of the first backoff, doubled on every retry up to maxBackoff
+        :param keepAlive: seconds an idle connection is kept open for the next request
+        :param connections: connections kept open
+        """
+        self.connections = connections
+        self.retries = retries
+        self.backoff = backoff
+        self.maxBackoff = maxBackoff
+        self.client = httpx.Client(headers=headers,
+                                   **clientOptions(connectTimeout, readTimeout, keepAlive, connections))
+        self.breaker = CircuitBreaker(failureThreshold, resetTimeout)
+        self.latency = LatencyHistogram()
+        self.lock = Lock()
+        self.requests = 0
+        self.retried = 0
+        self.failed = 0
+
+    @property
+    def headers(self):
+        return self.client.headers
+
+    def delay(self, attempt):
+        """full jitter: anywhere between 0 and the exponential backoff, so failing clients don't retry in step"""
+        return random.uniform(0, min(self.maxBackoff, self.backoff * 2 ** attempt))
+
+    def request(self, method, url, **kwargs):
+        """
+        raises CircuitOpen while the service is down, the last httpx error once the retries are used up.
+        a 429/5xx response that outlived its retries is returned
+        """
+        self.breaker.check()
+        with self.lock:
+            self.requests += 1
+        try:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    time.sleep(self.delay(attempt - 1))
+                    with self.lock:
+                        self.retried += 1
+                start = time.perf_counter()
+                try:
+                    response = self.client.request(method, url, **kwargs)
+                except TRANSPORT_ERRORS as e:
+                    self.latency.record(time.perf_counter() - start)
+                    logger.info('%s %s failed (attempt %d): %r', method, url, attempt + 1, e)
+                    error, response = e, None
+                    continue
+                self.latency.record(time.perf_counter() - start)
+                if response.status_code not in self.RETRY_STATUS:
+                    self.breaker.success()
+                    return response
+                logger.info('%s %s answered %d (attempt %d)', method, url, response.status_code, attempt + 1)
+                error = None
+        except BaseException:
+            # whatever went wrong, a half open trial must end in success or failure
+            self.failure()
+            raise
+        self.failure()
+        if response is None:
+            raise error
+        return response
+
+    def failure(self):
+        with self.lock:
+            self.failed += 1
+        self.breaker.failure()
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def stats(self):
+        with self.lock:
+            counts = {'requests': self.requests, 'retried': self.retried, 'failed': self.failed}
+        return dict(counts, circuit=self.breaker.state, latency=self.latency.snapshot())
+
+    def close(self):
+        self.client.close()
@@ -0,0 +1,151 @@
+"""
+Tells the language of a text locally, before it is sent to be translated.
+the unicode scripts of its letters narrow the languages down, often to a
+single one, and character n-gram profiles built from data/languageSamples.json
+choose between the languages that share a script.
+"""
+from collections import Counter
+import unicodedata
+import json
+import math
+import os
+try:
+    from TranslationWindow.ScriptDetection import characterScript, languageScripts
+except ModuleNotFoundError:
+    from ScriptDetection import characterScript, languageScripts
+try:
+    from ISO_converter import ISO_2_TO_3
+except ModuleNotFoundError:
+    from SettingsDialog.ISO_converter import ISO_2_TO_3
+
+# translator codes of languages that have another code
+ALIASES = {'iw': 'he', 'jw': 'jv', 'zh-cn': 'zh', 'zh-tw': 'zh', 'fa-af': 'fa', 'por': 'pt'}
+# scripts of the translator languages that have no tesseract language of the same code
+SCRIPTS = {
+    **dict.fromkeys(('zh', 'yue'), {'Han'}),
+    **dict.fromkeys(('ms-arab', 'pa-arab', 'ckb', 'bal'), {'Arabic'}),
+    **dict.fromkeys(('ava', 'abk', 'bak', 'bua', 'che', 'chv', 'kom', 'mhr', 'oss', 'sah', 'udm'), {'Cyrillic'}),
+    **dict.fromkeys(('awa', 'bho', 'mai', 'doi', 'gom', 'new', 'mwr'), {'Devanagari'}),
+    'tcy': {'Kannada'}, 'shn': {'Myanmar'}, 'mni-mtei': {'Meetei_Mayek'}, 'sat': {'Ol_Chiki'},
+}
+
+
+def normalizeCode(code):
+    return ALIASES.get(code, code)
+
+
+def codeScripts(code):
+    """the scripts a language of the translator is written in"""
+    code = normalizeCode(code)
+    if code in SCRIPTS:
+        return SCRIPTS[code]
+    return languageScripts(ISO_2_TO_3.get(code, '') if len(code) == 2 else code)
+
+
+def words(text):
+    """the lowercase words of the letters of text. digits, punctuation and OCR debris split words"""
+    letters = ''.join(character if character.isalpha() else ' ' for character in text.lower()
+                      if unicodedata.category(character) != 'Mn')  # niqqud, harakat
+    return letters.split()
+
+
+def ngrams(words, order):
+    grams = []
+    for word in words:
+        word = f' {word} '
+        for n in range(1, order + 1):
+            grams.extend(word[i:i + n] for i in range(len(word) - n + 1))
+    return [gram for gram in grams if gram != ' ']
+
+
+def scriptShares(words):
+    counts = Counter(filter(None, map(characterScript, ''.join(words))))
+    total = sum(counts.values())
+    return {script: count / total for script, count in counts.items()}
+
+
+class LanguageIdentifier:
+    samplesPath = os.path.join('data', 'languageSamples.json')
+
+    def __init__(self, languages=None, path=samplesPath, order=3, smoothing=.5, minConfidence=.9,
+                 minCoverage=.5, minShare=.1):
+        """
+        :param languages: codes of the translator languages, e.g googletrans.LANGUAGES. the sampled ones by default
+        :param path: JSON file of the form {"samples": {"en": "text in english", ...}}
+        :param order: the longest n-gram of the profiles
+        :param minConfidence: probability of the best language, among the ones sharing its script,
+            for isLanguage to trust it
+        :param minCoverage: share of the trigrams of the text the best profile must know when some languages
+            of the script have no profile, below it the text may be in one of them
+        :param minShare: share of the letters a script needs to count
+        """
+        with open(path, encoding='utf-8') as file:
+            samples = json.load(file)['samples']
+        self.order = order
+        self.minConfidence = minConfidence
+        self.minCoverage = minCoverage
+        self.minShare = minShare
+        counts = {language: Counter(ngrams(words(sample), order)) for language, sample in samples.items()}
+        totals = {language: math.log(sum(grams.values()) + smoothing * (len(grams) + 1))
+                  for language, grams in counts.items()}
+        # the same for every profile, or the ones of the shorter samples would win the unseen n-grams
+        self.unseen = math.log(smoothing) - max(totals.values())
+        # {language: {n-gram: log probability}}
+        self.profiles = {language: {gram: math.log(count + smoothing) - totals[language]
+                                    for gram, count in grams.items()} for language, grams in counts.items()}
+        codes = {normalizeCode(code) for code in languages or ()} | set(samples)
+        self.scripts = {code: frozenset(codeScripts(code)) for code in codes}
+
+    def candidates(self, shares):
+        """the languages written in the scripts of the text, those written in just them first"""
+        scripts = {script for script, share in shares.items() if share >= self.minShare}
+        candidates = [code for code, written in self.scripts.items() if written >= scripts]
+        if not candidates:
+            # mixed text, e.g an english name in a hebrew sentence. the main script decides
+            scripts = {max(shares, key=shares.get)}
+            candidates = [code for code, written in self.scripts.items() if written >= scripts]
+        return [code for code in candidates if self.scripts[code] == scripts] or candidates
+
+    def identify(self, text):
+        """
+        :returns: (language, confidence), (None, 0) when the text can't be told.
+            confidence is 1 when the scripts of the text leave a single language
+        """
+        textWords = words(text)
+        shares = scriptShares(textWords)
+        if not shares:
+            return None, 0.
+        candidates = self.candidates(shares)
+        if len(candidates) == 1:
+            return candidates[0], 1.
+        profiled = [code for code in candidates if code in self.profiles]
+        grams = ngrams(textWords, self.order)
+        if not profiled or not grams:
+            return None, 0.
+
+        scores = {}
+        for code in profiled:
+            profile = self.profiles[code]
+            # every letter is in an n-gram of each order, the sum per order is the likelihood of the text
+            scores[code] = sum(profile.get(gram, self.unseen) for gram in grams) / self.order
+        best = max(scores, key=scores.get)
+        confidence = 1 / sum(math.exp(score - scores[best]) for score in scores.values())
+        if len(profiled) < len(candidates):
+            trigrams = [gram for gram in grams if len(gram) == self.order]
+            known = sum(gram in self.profiles[best] for gram in trigrams)
+            if trigrams and known / len(trigrams) < self.minCoverage:
+                return None, 0.
+        return best, confidence
+
+    def isLanguage(self, text, language):
+        """whether text is written in language, None when it can't be told"""
+        language = normalizeCode(language)
+        shares = scriptShares(words(text))
+        if not shares:
+            return None
+        if not self.scripts.get(language, codeScripts(language)) & set(shares):
+            return False
+        guess, confidence = self.identify(text)
+        if guess is None or confidence < self.minConfidence:
+            return None
+        return guess == language
@@ -4,13 +4,33 @@ import sys
 
 class MessageEntry(QtWidgets.QTextEdit):
     returnPressed = QtCore.pyqtSignal(str)
+    typingPaused = QtCore.pyqtSignal(str)  # text, once the user stopped editing it for the debounce interval
+
+    def __init__(self, parent=None, debounce=300):
+        """
+        :param debounce: milliseconds without an edit before typingPaused is emitted
+        """
+        super(MessageEntry, self).__init__(parent)
+        self.debounceTimer = QtCore.QTimer(self)
+        self.debounceTimer.setSingleShot(True)
+        self.debounceTimer.setInterval(debounce)
+        self.debounceTimer.timeout.connect(lambda: self.typingPaused.emit(self.toPlainText()))
 
     def keyPressEvent(self, e: QtGui.QKeyEvent) -> None:
         if (e.key() == QtCore.Qt.Key_Enter or e.key() == QtCore.Qt.Key_Return) and \
                 not e.modifiers() & QtCore.Qt.ShiftModifier:
+            self.debounceTimer.stop()
             self.returnPressed.emit(self.toPlainText())
             return
-        return super(MessageEntry, self).keyPressEvent(e)
+        # only edits of the user restart the timer, not text set by the window
+        before = self.toPlainText()
+        super(MessageEntry, self).keyPressEvent(e)
+        if self.toPlainText() != before:
+            self.debounceTimer.start()
+
+    def insertFromMimeData(self, source: QtCore.QMimeData) -> None:
+        super(MessageEntry, self).insertFromMimeData(source)
+        self.debounceTimer.start()
 
 
 if __name__ == '__main__':
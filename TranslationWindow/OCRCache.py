@@ -0,0 +1,192 @@
+from collections import OrderedDict
+from threading import Lock
+import hashlib
+import sqlite3
+import json
+import time
+import numpy
+import cv2
+
+
+class OCRCache:
+    """
+    Caches OCR results by the hash of the pixels they were read from.
+    The first tier is a bounded in-memory LRU, the optional second tier is a
+    size capped SQLite file that survives restarts.
+    With perceptual=True a miss falls back to comparing difference hashes, so
+    a selection moved by a pixel or two still hits.
+    """
+    cacheDatabasePath = 'data\\ocr_cache.sqlite'
+
+    def __init__(self, size=256, path=None, maxBytes=16 * 1024 * 1024, perceptual=False, maxDistance=4):
+        """
+        :param size: number of results kept in memory
+        :param path: path of the SQLite tier. None keeps the cache in memory only
+        :param maxBytes: size cap of the SQLite tier
+        :param perceptual: match near identical images by their dHash
+        :param maxDistance: hamming distance between dHashes that still counts as the same image
+        """
+        self.size = size
+        self.maxBytes = maxBytes
+        self.perceptual = perceptual
+        self.maxDistance = maxDistance
+        self.memory = OrderedDict()
+        # {key: (scope, dHash, height, width)} of the entries in memory
+        self.fingerprints = {}
+        self.lock = Lock()
+        self.memoryHits = 0
+        self.diskHits = 0
+        self.perceptualHits = 0
+        self.misses = 0
+
+        self.connection = None
+        if path is not None:
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute('CREATE TABLE IF NOT EXISTS cache ('
+                                    'key TEXT PRIMARY KEY, scope TEXT, dhash TEXT, height INTEGER, width INTEGER, '
+                                    'value TEXT, size INTEGER, used REAL)')
+            self.connection.commit()
+
+    @staticmethod
+    def scope(kind, lang, config):
+        return '\0'.join((kind, lang or '', config or ''))
+
+    @staticmethod
+    def key(image, scope):
+        digest = hashlib.sha1(scope.encode('utf-8'))
+        digest.update(str(image.shape).encode('utf-8'))
+        digest.update(numpy.ascontiguousarray(image))
+        return digest.hexdigest()
+
+    @staticmethod
+    def dHash(image):
+        """64 bit difference hash of the image"""
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY if image.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA)
+        value = 0
+        for bit in (small[:, 1:] > small[:, :-1]).flatten():
+            value = (value << 1) | int(bit)
+        return value
+
+    def similar(self, fingerprint, other):
+        scope, dHash, height, width = fingerprint
+        otherScope, otherHash, otherHeight, otherWidth = other
+        return (scope == otherScope and
+                abs(height - otherHeight) <= 4 and abs(width - otherWidth) <= 4 and
+                bin(dHash ^ otherHash).count('1') <= self.maxDistance)
+
+    def get(self, image, kind, lang='', config=''):
+        """returns the cached result or None"""
+        scope = self.scope(kind, lang, config)
+        key = self.key(image, scope)
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.memoryHits += 1
+                return self.memory[key]
+
+            row = self.diskGet(key)
+            if row is not None:
+                value, fingerprint = row
+                self.diskHits += 1
+                self.remember(key, value, fingerprint)
+                return value
+
+            if self.perceptual:
+                fingerprint = (scope, self.dHash(image), *image.shape[:2])
+                value = self.perceptualGet(fingerprint)
+                if value is not None:
+                    self.perceptualHits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, image, kind, value, lang='', config=''):
+        scope = self.scope(kind, lang, config)
+        key = self.key(image, scope)
+        fingerprint = (scope, self.dHash(image), *image.shape[:2])
+        with self.lock:
+            self.remember(key, value, fingerprint)
+            self.diskPut(key, fingerprint, value)
+
+    def remember(self, key, value, fingerprint):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        if fingerprint is not None:
+            self.fingerprints[key] = fingerprint
+        while len(self.memory) > self.size:
+            oldest, _ = self.memory.popitem(last=False)
+            self.fingerprints.pop(oldest, None)
+
+    def perceptualGet(self, fingerprint):
+        for key, other in self.fingerprints.items():
+            if self.similar(fingerprint, other):
+                self.memory.move_to_end(key)
+                return self.memory[key]
+        if self.connection is None:
+            return None
+        rows = self.connection.execute('SELECT key, dhash, height, width, value FROM cache WHERE scope = ?',
+                                       (fingerprint[0],)).fetchall()
+        for key, dHash, height, width, value in rows:
+            other = (fingerprint[0], int(dHash, 16), height, width)
+            if self.similar(fingerprint, other):
+                self.connection.execute('UPDATE cache SET used = ? WHERE key = ?', (time.time(), key))
+                self.connection.commit()
+                value = json.loads(value)
+                self.remember(key, value, other)
+                return value
+        return None
+
+    def diskGet(self, key):
+        """returns (value, fingerprint) of the row, the fingerprint lets perceptual lookups match it in memory"""
+        if self.connection is None:
+            return None
+        row = self.connection.execute('SELECT scope, dhash, height, width, value FROM cache WHERE key = ?',
+                                      (key,)).fetchone()
+        if row is None:
+            return None
+        self.connection.execute('UPDATE cache SET used = ? WHERE key = ?', (time.time(), key))
+        self.connection.commit()
+        scope, dHash, height, width, value = row
+        return json.loads(value), (scope, int(dHash, 16), height, width)
+
+    def diskPut(self, key, fingerprint, value):
+        if self.connection is None:
+            return
+        scope, dHash, height, width = fingerprint
+        value = json.dumps(value)
+        self.connection.execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                (key, scope, format(dHash, 'x'), height, width, value, len(value), time.time()))
+        total = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM cache').fetchone()[0]
+        if total > self.maxBytes:
+            # evict the least recently used rows until the file fits its cap again
+            excess = total - self.maxBytes
+            evicted = []
+            for oldKey, size in self.connection.execute('SELECT key, size FROM cache ORDER BY used'):
+                if excess <= 0:
+                    break
+                evicted.append((oldKey,))
+                excess -= size
+            self.connection.executemany('DELETE FROM cache WHERE key = ?', evicted)
+        self.connection.commit()
+
+    def stats(self):
+        with self.lock:
+            hits = self.memoryHits + self.diskHits + self.perceptualHits
+            return {
+                'memoryHits': self.memoryHits,
+                'diskHits': self.diskHits,
+                'perceptualHits': self.perceptualHits,
+                'misses': self.misses,
+                'hitRate': hits / (hits + self.misses) if hits + self.misses else 0,
+            }
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            self.fingerprints.clear()
+            if self.connection is not None:
+                self.connection.execute('DELETE FROM cache')
+                self.connection.commit()
@@ -0,0 +1,251 @@
+"""
+Reads the text of a capture: resizing, binarization, language pruning, layout
+and the recognition of the variants.
+Importing this module has no side effects, the OCR worker processes run it
+without the singletons of Translate. whatever is kept across captures, the
+caches, the variant stats and the OCR speed, is owned by the caller.
+"""
+from contextlib import contextmanager
+from threading import Lock
+import logging
+import time
+import os
+import cv2
+import numpy
+import modded_pytesseract as tess
+try:
+    from TranslationWindow.OCRScheduler import runVariants
+    from TranslationWindow.TextRegions import recognizeRegions
+    from TranslationWindow.PageSegmentation import pageSegmentationMode
+    from TranslationWindow.ScriptDetection import pruneLanguages
+    from TranslationWindow.OCRStream import replayLines
+    from TranslationWindow.Resolution import normalizeResolution
+    from TranslationWindow.Presets import getPreset, engineConfig, presetTimeout, DEFAULT
+except ModuleNotFoundError:
+    from OCRScheduler import runVariants
+    from TextRegions import recognizeRegions
+    from PageSegmentation import pageSegmentationMode
+    from ScriptDetection import pruneLanguages
+    from OCRStream import replayLines
+    from Resolution import normalizeResolution
+    from Presets import getPreset, engineConfig, presetTimeout, DEFAULT
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = ('otsu', 'fixed', 'otsu inverted', 'fixed inverted')
+
+
+def cpuTime():
+    """CPU seconds of this process and of the tesseract processes it has waited for"""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+class TextRecognizer:
+    def __init__(self, img, name='', lang='', config='', cancel=None, onLine=None, timeout=0, cache=None):
+        """
+        :param onLine: function(text, confidence) that gets the lines of every text region as soon as it is read
+        :param timeout: seconds every tesseract process may run, 0 for no limit
+        :param cache: OCRCache of the variants, None to always read them
+        """
+        self.name = name
+        self.image = img
+        self.lang = lang
+        self.config = config
+        self.regions = []  # [{'box': (x, y, w, h), 'seconds': float}] when the image was read by blocks
+        cached = None if cache is None else cache.get(self.image, 'variant', self.lang, self.config)
+        if cached is not None:
+            self.dict, self.text = tess.typed_columns(cached[0]), cached[1]
+            if onLine is not None:
+                replayLines(self.dict, onLine)
+        else:
+            onRegion = None if onLine is None else lambda data: replayLines(data, onLine)
+            self.dict, self.text, self.regions = recognizeRegions(
+                self.image,
+                lambda image: tess.image_to_data_and_text(image, self.lang, self.config, timeout=timeout,
+                                                          cancel=cancel),
+                onRegion
+            )
+            if cache is not None:
+                cache.put(self.image, 'variant', (tess.columns_to_lists(self.dict), self.text), self.lang, self.config)
+            if self.regions:
+                logger.debug('%s: %d text regions, %s', self.name, len(self.regions),
+                             ', '.join(f"{region['seconds']:.2f}s" for region in self.regions))
+
+    def getAverageConfidence(self):
+        return tess.mean_confidence(self.dict)
+
+    def getText(self):
+        return self.text
+
+    def __str__(self):
+        return "" + \
+               self.name + ":" + '\n' + \
+               "config: " + self.config + '\n' + \
+               "confident: " f"{self.getAverageConfidence():.2f}" + '\n'
+
+
+class OCRRequest:
+    """
+    Reading the text of a single capture. the request owns its languages, config,
+    candidates and result, so any number of requests can run at the same time.
+    """
+    # what a request read in another process reports back, see report()
+    REPORTED = ('result', 'lang', 'config', 'scale', 'pixels', 'winner', 'tried', 'timings')
+
+    def __init__(self, mat, lang, psm='auto', threshold=None, onLine=None, timeout=0, preset=DEFAULT,
+                 onCandidate=None, order=VARIANTS, cache=None):
+        """
+        :param mat: BGRA opencv MAT of the capture
+        :param lang: tesseract language set
+        :param psm: page segmentation mode setting, one of PageSegmentation.MODES
+        :param threshold: mean OCR confidence that is good enough to skip the remaining variants
+        :param onLine: function(text, confidence) that gets the lines of the first variant while it is read
+        :param timeout: seconds the whole request may take, 0 for no limit
+        :param preset: name of the pipeline in Presets.PRESETS. it scales timeout
+        :param onCandidate: function(text, confidence) called with every variant as soon as it is read
+        :param order: names of the variants, the most promising first, e.g VariantScheduler.order(VARIANTS)
+        :param cache: OCRCache of the captures, the variants and the scripts, None to read everything
+        """
+        self.mat = mat
+        self.languages = lang
+        self.lang = lang
+        self.psm = psm
+        self.presetName = preset
+        self.preset = getPreset(preset)
+        timeout = presetTimeout(self.preset, timeout)
+        self.threshold = threshold
+        self.config = ''
+        self.onLine = onLine
+        self.onCandidate = onCandidate
+        self.order = list(order)
+        self.cache = cache
+        self.candidates = []
+        self.lock = Lock()
+        self.result = None
+        self.scale = 1.  # resize factor of the capture before it was read
+        self.pixels = None  # pixel count of the resized capture
+        self.winner = None  # name of the variant whose text is the result, None when it came from the cache
+        self.tried = []  # names of the variants that finished recognizing
+        self.secondsSaved = None  # estimated OCR time the resize saved (negative when enlarging cost time)
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.cancelToken = tess.CancelToken()
+        self.timings = {}  # {stage of run(): (wall seconds, cpu seconds)}
+
+    def cancel(self):
+        """kills the tesseract processes of the request, run() raises TesseractCancelled"""
+        self.cancelToken.cancel()
+
+    def remaining(self):
+        """seconds left until the deadline, 0 when there is none"""
+        if self.deadline is None:
+            return 0
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise RuntimeError('Tesseract process timeout')
+        return remaining
+
+    def recognize(self, img, name='', cancel=None):
+        with self.lock:
+            # only the most promising variant, which starts first, streams its lines
+            onLine, self.onLine = self.onLine, None
+        recognizer = TextRecognizer(img, name, self.lang, self.config, cancel, onLine, self.remaining(), self.cache)
+        with self.lock:
+            self.candidates.append(recognizer)
+        if self.onCandidate is not None:
+            self.onCandidate(recognizer.getText(), recognizer.getAverageConfidence())
+        return recognizer
+
+    def mostReliable(self):
+        with self.lock:
+            return max(self.candidates, key=lambda x: x.getAverageConfidence())
+
+    def reportResize(self, speed):
+        """
+        teaches speed how long OCR took on the resized capture
+        :param speed: Resolution.OCRSpeed
+        """
+        seconds, resizing = self.timings['recognize'][0], self.timings['resize'][0]
+        if self.scale == 1:
+            speed.update(self.pixels, seconds)
+            return
+        original = self.mat.shape[0] * self.mat.shape[1]
+        estimate = speed.estimate(original)
+        speed.update(self.pixels, seconds)
+        if estimate is not None:
+            self.secondsSaved = estimate - seconds - resizing
+        logger.info('capture scaled by %.2f (%d -> %d pixels) in %.3fs, saved about %s', self.scale, original,
+                    self.pixels, resizing, 'unknown' if self.secondsSaved is None else f'{self.secondsSaved:.2f}s')
+
+    def report(self):
+        """what the process that owns the caches and the stats needs of a request read in another one"""
+        return {name: getattr(self, name) for name in self.REPORTED}
+
+    def update(self, report):
+        """takes the outcome of the same request read in another process, see report()"""
+        for name, value in report.items():
+            setattr(self, name, value)
+
+    def cacheOptions(self):
+        return f'psm {self.psm} preset {self.presetName}'
+
+    @contextmanager
+    def stage(self, name):
+        """times a step of run() into self.timings"""
+        wall, cpu = time.perf_counter(), cpuTime()
+        try:
+            yield
+        finally:
+            self.timings[name] = (time.perf_counter() - wall, cpuTime() - cpu)
+
+    def run(self):
+        """reads the capture and returns its text"""
+        # the capture is looked up before its languages are pruned, so it's stored under the unpruned set too
+        with self.stage('cache'):
+            self.result = None if self.cache is None else self.cache.get(self.mat, 'capture', self.languages,
+                                                                         self.cacheOptions())
+        if self.result is None:
+            with self.stage('resize'):
+                gray, self.scale = normalizeResolution(cv2.cvtColor(self.mat, cv2.COLOR_BGRA2GRAY),
+                                                       self.preset['targetHeight'], self.preset['minHeight'],
+                                                       self.preset['maxHeight'])
+                self.pixels = gray.size
+            with self.stage('binarize'):
+                variants = improveImage(gray)
+                names = [name for name in self.order if name in variants][:self.preset['variants']]
+            with self.stage('languages'):
+                self.lang = pruneLanguages(variants['otsu'], self.languages, self.cache, self.cancelToken,
+                                           self.remaining())
+            with self.stage('layout'):
+                self.config = f"--psm {pageSegmentationMode(variants['otsu'], self.psm)}" + engineConfig(self.preset)
+            with self.stage('recognize'):
+                winner, tried = runVariants(variants, names, self.recognize, self.threshold, self.cancelToken)
+            if self.cancelToken.cancelled:
+                # superseded while a variant finished, the latest request is the one that translates.
+                # its variants didn't compete, so they aren't counted either
+                raise tess.TesseractCancelled()
+            self.winner, self.tried = winner.name, tried
+            logger.info('%s (%s, %s) won with confidence %.2f', winner.name, self.lang, self.config,
+                        winner.getAverageConfidence())
+            self.result = winner.getText()
+            if self.cache is not None:
+                self.cache.put(self.mat, 'capture', self.result, self.languages, self.cacheOptions())
+        return self.result
+
+
+def improveImage(mat):
+    """
+    Produces every binarization of the capture from a single gray buffer.
+    all the variants are written into one preallocated block.
+    :param mat: BGRA or gray opencv MAT
+    returns {variant name: image}
+    """
+    gray = mat if mat.ndim == 2 else cv2.cvtColor(mat, cv2.COLOR_BGRA2GRAY)
+    variants = numpy.empty((len(VARIANTS),) + gray.shape, numpy.uint8)
+
+    cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU, dst=variants[0])
+    cv2.threshold(gray, 220, 255, cv2.THRESH_BINARY_INV, dst=variants[1])
+    cv2.bitwise_not(variants[0], dst=variants[2])
+    cv2.bitwise_not(variants[1], dst=variants[3])
+
+    return dict(zip(VARIANTS, variants))
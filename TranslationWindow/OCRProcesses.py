@@ -0,0 +1,143 @@
+"""
+Runs whole OCR requests (preprocessing, tesseract and parsing) in worker
+processes, away from the GIL of the GUI process.
+The captured pixels are handed over through shared memory, only the
+recognized text and what the parent records about it come back.
+the workers import the side effect free OCRPipeline. the SQLite caches and
+the variant stats stay in the parent process, every worker keeps an in memory
+OCRCache of its own, so a capture read again doesn't detect its scripts again.
+"""
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+import logging
+import os
+import time
+import numpy
+import modded_pytesseract as tess
+try:
+    from TranslationWindow.OCRPipeline import OCRRequest, VARIANTS
+    from TranslationWindow.OCRCache import OCRCache
+except ModuleNotFoundError:
+    from OCRPipeline import OCRRequest, VARIANTS
+    from OCRCache import OCRCache
+try:
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError:  # python < 3.8, the pixels are pickled instead
+    shared_memory = None
+
+logger = logging.getLogger(__name__)
+# the in memory cache of a worker process, made by configure()
+workerCache = None
+
+
+def configure(tesseractCommand):
+    """runs in every worker as it starts, tesseract is found where the parent finds it"""
+    global workerCache
+    tess.modded_pytesseract.tesseract_cmd = tesseractCommand
+    workerCache = OCRCache()
+
+
+def ready(_):
+    time.sleep(.1)  # keeps this worker busy so the next call starts another one
+    return os.getpid()
+
+
+def readArray(mat, lang, psm, threshold, timeout, preset, order):
+    """returns OCRRequest.report() of the capture"""
+    request = OCRRequest(mat, lang, psm, threshold, timeout=timeout, preset=preset, order=order, cache=workerCache)
+    request.run()
+    return request.report()
+
+
+def readShared(name, shape, dtype, lang, psm, threshold, timeout, preset, order):
+    """reads the capture from the shared memory block `name`. the block is owned by the caller"""
+    block = shared_memory.SharedMemory(name)
+    if os.name == 'posix':
+        # attaching registers the block with the resource tracker as if this process owned it (bpo-39959)
+        resource_tracker.unregister(block._name, 'shared_memory')
+    try:
+        mat = numpy.ndarray(shape, dtype, buffer=block.buf)
+        mat.flags.writeable = False
+        try:
+            return readArray(mat, lang, psm, threshold, timeout, preset, order)
+        finally:
+            del mat  # the block can't be closed while a view of it exists
+    finally:
+        block.close()
+
+
+def release(block, future=None):
+    block.close()
+    block.unlink()
+
+
+class OCRProcessPool:
+    def __init__(self, size=2):
+        """
+        :param size: number of worker processes
+        """
+        self.size = size
+        self.executor = None
+
+    def start(self):
+        """forks the workers now, so the first capture doesn't wait for them to import everything"""
+        if self.executor is not None:
+            return
+        self.executor = ProcessPoolExecutor(self.size, initializer=configure,
+                                            initargs=(tess.modded_pytesseract.tesseract_cmd,))
+        pids = list(self.executor.map(ready, range(self.size)))
+        logger.info('OCR worker processes %s started', pids)
+
+    def running(self):
+        return self.executor is not None
+
+    @staticmethod
+    def wait(future, cancel=None):
+        """
+        waits for the future unless cancel is cancelled first. a worker can't be
+        interrupted, it finishes the request on its own within the request's timeout
+        """
+        while True:
+            try:
+                return future.result(.1)
+            except TimeoutError:
+                if cancel is not None and cancel.cancelled:
+                    future.cancel()
+                    raise tess.TesseractCancelled()
+
+    def read(self, mat: numpy.ndarray, lang, psm='auto', threshold=None, timeout=0, cancel=None, preset='balanced',
+             order=VARIANTS):
+        """
+        reads the capture in a worker process, see OCRPipeline.OCRRequest
+        :returns: OCRRequest.report(), the text and what to record about it
+        :param timeout: seconds the request may take in the worker, 0 for no limit
+        :param cancel: CancelToken that stops waiting for the worker
+        :param preset: name of the OCR pipeline in Presets.PRESETS
+        :param order: names of the variants, the most promising first
+        """
+        if shared_memory is None:
+            return self.wait(self.executor.submit(readArray, numpy.ascontiguousarray(mat), lang, psm, threshold,
+                                                  timeout, preset, order), cancel)
+
+        block = shared_memory.SharedMemory(create=True, size=max(mat.nbytes, 1))
+        future = None
+        try:
+            shared = numpy.ndarray(mat.shape, mat.dtype, buffer=block.buf)
+            shared[...] = mat
+            del shared
+            future = self.executor.submit(readShared, block.name, mat.shape, mat.dtype.str,
+                                          lang, psm, threshold, timeout, preset, order)
+            return self.wait(future, cancel)
+        finally:
+            if future is None or future.done():
+                release(block)
+            else:
+                # cancelled while a worker still reads the block, it is released once the worker is done
+                future.add_done_callback(partial(release, block))
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
@@ -0,0 +1,104 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, CancelledError
+from threading import Lock
+import modded_pytesseract as tess
+from SettingsDialog.shortcutDialog import DataBaseTemplate
+
+
+class VariantStatsDataBase(DataBaseTemplate.DataBaseHandlerTemplate):
+    connectedBases = {
+        # {path: [VariantStatsDataBase]}
+    }
+
+    def __init__(self, path):
+        super(VariantStatsDataBase, self).__init__(path, {})
+
+    def record(self, winner: str, tried: list):
+        """
+        :param winner: name of the variant whose text was used
+        :param tried: names of all the variants that finished recognizing
+        """
+        for name in tried:
+            stats = self.data.setdefault(name, {'wins': 0, 'runs': 0})
+            stats['runs'] += 1
+            if name == winner:
+                stats['wins'] += 1
+
+    def winRate(self, name):
+        stats = self.data.get(name, {'wins': 0, 'runs': 0})
+        # a variant that was never tried starts in the middle
+        return (stats['wins'] + 1) / (stats['runs'] + 2)
+
+    def copyData(self):
+        return {key: self.data[key].copy() for key in self.data}
+
+
+# mean word confidence that settles a capture
+THRESHOLD = 85
+# number of variants recognized at the same time
+CONCURRENCY = 2
+
+
+def runVariants(variants: dict, names, recognize, threshold=THRESHOLD, cancel=None, concurrency=CONCURRENCY):
+    """
+    recognizes the variants in the order of names and stops at the first confident one
+    :param variants: {name: image}
+    :param names: names of the variants to recognize, the most promising first
+    :param recognize: function(image, name, cancel) that returns a TextRecognizer. called from worker threads
+    :param cancel: CancelToken of the whole request. cancelling it stops every variant
+    :returns: (the most reliable TextRecognizer, names of the variants that finished recognizing)
+    """
+    threshold = THRESHOLD if threshold is None else threshold
+    cancel = tess.CancelToken() if cancel is None else cancel.child()
+    results = []
+    error = None
+    winner = None
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        pending = {executor.submit(recognize, variants[name], name, cancel) for name in names}
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except (tess.TesseractCancelled, CancelledError):
+                    continue
+                except Exception as e:
+                    error = e
+                    continue
+                results.append(result)
+                if result.getAverageConfidence() >= threshold:
+                    winner = result
+        for future in pending:
+            future.cancel()
+        cancel.cancel()
+
+    if not results:
+        raise error if error is not None else tess.TesseractCancelled()
+    if winner is None:
+        winner = max(results, key=lambda x: x.getAverageConfidence())
+    return winner, [result.name for result in results]
+
+
+class VariantScheduler:
+    """
+    Orders OCR variants by their win rate. the variants are run by runVariants, possibly in
+    another process, and only the process that owns the scheduler records who won
+    """
+    statsDatabasePath = 'data\\ocr_stats.db'
+
+    def __init__(self, statsPath=statsDatabasePath):
+        self.stats = VariantStatsDataBase(statsPath)
+        self.lock = Lock()
+
+    def order(self, names):
+        with self.lock:
+            return sorted(names, key=lambda name: -self.stats.winRate(name))
+
+    def record(self, winner: str, tried: list):
+        """
+        :param winner: name of the variant whose text was used
+        :param tried: names of all the variants that finished recognizing
+        """
+        with self.lock:
+            self.stats.record(winner, tried)
+            self.stats.commitChanges()
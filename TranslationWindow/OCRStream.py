@@ -0,0 +1,35 @@
+"""
+Reports the text lines of tesseract's TSV output, so a window can show the
+lines of a capture's text regions as they are read, before OCR is done.
+tesseract prints the rows of a page only once the whole page is recognized,
+the regions are what makes the lines come early.
+"""
+
+
+def dataRows(data):
+    """the rows of a columnar tsv dict as {column: value} dicts"""
+    return (dict(zip(data, values)) for values in zip(*data.values()))
+
+
+def streamLines(rows):
+    """yields (text, confidence) of every line of the {column: value} rows once its last word was read"""
+    words, confidences = [], []
+    current = None
+    for row in rows:
+        if row['level'] != 5 or not str(row['text']).strip():
+            continue
+        line = (row['page_num'], row['block_num'], row['par_num'], row['line_num'])
+        if line != current and words:
+            yield ' '.join(words), sum(confidences) / len(confidences)
+            words, confidences = [], []
+        current = line
+        words.append(row['text'])
+        confidences.append(float(row['conf']))
+    if words:
+        yield ' '.join(words), sum(confidences) / len(confidences)
+
+
+def replayLines(data, onLine):
+    """reports the lines of an already read tsv dict"""
+    for text, confidence in streamLines(dataRows(data)):
+        onLine(text, confidence)
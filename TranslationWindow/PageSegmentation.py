@@ -0,0 +1,62 @@
+import numpy
+import cv2
+try:
+    from TranslationWindow.TextRegions import foreground
+except ModuleNotFoundError:
+    from TextRegions import foreground
+
+SINGLE_BLOCK = 6
+SINGLE_LINE = 7
+SINGLE_WORD = 8
+SPARSE_TEXT = 11
+
+# {setting: tesseract --psm}
+MODES = {
+    'auto': None,
+    'word': SINGLE_WORD,
+    'line': SINGLE_LINE,
+    'block': SINGLE_BLOCK,
+    'sparse': SPARSE_TEXT,
+}
+
+
+def textRows(mask, minHeight):
+    """returns (top, bottom) of the runs of rows that contain text, taller than minHeight"""
+    rows = numpy.flatnonzero(numpy.diff(numpy.concatenate(([0], mask.any(axis=1).astype(numpy.int8), [0]))))
+    return [(top, bottom) for top, bottom in zip(rows[::2], rows[1::2]) if bottom - top >= minHeight]
+
+
+def choosePSM(binary):
+    """
+    Picks tesseract's page segmentation mode from the geometry of a binarized crop:
+    the aspect ratio, the text lines of the row projection and the connected components.
+    """
+    mask = foreground(binary)
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    stats = stats[1:][stats[1:, cv2.CC_STAT_AREA] >= 4]
+    if not len(stats):
+        return SINGLE_BLOCK
+
+    height, width = mask.shape[:2]
+    charHeight = float(numpy.median(stats[:, cv2.CC_STAT_HEIGHT]))
+    rows = textRows(mask, max(2, charHeight * .3))
+
+    if len(rows) <= 1 or (height < charHeight * 2.5 and width / height > 2):
+        # a single line. it is a single word when there are no word sized gaps
+        components = stats[numpy.argsort(stats[:, cv2.CC_STAT_LEFT])]
+        rights = numpy.maximum.accumulate(components[:, cv2.CC_STAT_LEFT] + components[:, cv2.CC_STAT_WIDTH])
+        gaps = components[1:, cv2.CC_STAT_LEFT] - rights[:-1]
+        return SINGLE_WORD if not (gaps > charHeight * .5).any() else SINGLE_LINE
+
+    # scattered text: little ink and lines far apart from each other
+    boxesArea = float((stats[:, cv2.CC_STAT_WIDTH] * stats[:, cv2.CC_STAT_HEIGHT]).sum())
+    lineGaps = [nextTop - bottom for (_, bottom), (nextTop, _) in zip(rows, rows[1:])]
+    if boxesArea / (width * height) < .03 or numpy.median(lineGaps) > charHeight * 2.5:
+        return SPARSE_TEXT
+    return SINGLE_BLOCK
+
+
+def pageSegmentationMode(binary, setting='auto'):
+    """returns the --psm of the setting, chosen automatically for 'auto'"""
+    psm = MODES.get(setting)
+    return psm if psm is not None else choosePSM(binary)
@@ -0,0 +1,77 @@
+"""
+Named OCR pipelines that trade speed for accuracy: how many binarizations
+are read, which tesseract engine and models read them, how the capture is
+scaled and how long reading it may take.
+"""
+import os
+import modded_pytesseract as tess
+
+# tesseract --oem values. None keeps the engine the traineddata was built for
+LEGACY = 0
+LSTM = 1
+
+FAST = 'fast'
+BALANCED = 'balanced'
+ACCURATE = 'accurate'
+DEFAULT = BALANCED
+
+PRESETS = {
+    FAST: {
+        'variants': 1,  # binarizations read, by win rate
+        'oem': LSTM,
+        'tessdata': 'tessdata_fast',  # models folder next to the tesseract executable, None for the bundled ones
+        'targetHeight': 24,  # median character height the capture is scaled to
+        'minHeight': 16,
+        'maxHeight': 40,
+        'timeoutFactor': 1 / 3,  # of the OCR Timeout setting
+    },
+    BALANCED: {
+        'variants': 4,
+        'oem': None,
+        'tessdata': None,
+        'targetHeight': 30,
+        'minHeight': 20,
+        'maxHeight': 60,
+        'timeoutFactor': 1,
+    },
+    ACCURATE: {
+        'variants': 4,
+        'oem': LSTM,
+        'tessdata': 'tessdata_best',
+        'targetHeight': 36,
+        'minHeight': 28,
+        'maxHeight': 60,
+        'timeoutFactor': 4,
+    },
+}
+
+
+def getPreset(name):
+    """the preset called name, the default one for unknown names"""
+    return PRESETS.get(name, PRESETS[DEFAULT])
+
+
+def tessdataDirectory(preset):
+    """the models folder of the preset, None when it uses the bundled models or its folder isn't installed"""
+    if preset['tessdata'] is None:
+        return None
+    directory = os.path.join(os.path.dirname(os.path.abspath(tess.modded_pytesseract.tesseract_cmd)),
+                             preset['tessdata'])
+    # the config is split like a posix command line, where backslashes are escapes
+    return directory.replace('\\', '/') if os.path.isdir(directory) else None
+
+
+def engineConfig(preset):
+    """the tesseract options of the preset's engine, to append to --psm"""
+    config = ''
+    if preset['oem'] is not None:
+        config += f" --oem {preset['oem']}"
+    directory = tessdataDirectory(preset)
+    if directory is not None:
+        config += f' --tessdata-dir "{directory}"'
+    return config
+
+
+def presetTimeout(preset, timeout=0):
+    """the deadline of the preset in seconds given the OCR Timeout setting, 0 for no limit"""
+    return timeout * preset['timeoutFactor']
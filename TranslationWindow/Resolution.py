@@ -0,0 +1,78 @@
+"""
+Resizes captures so their text is about the height tesseract reads best.
+Tesseract's runtime grows with the pixel count while its accuracy collapses
+on characters shorter than about 20 pixels, so huge text is shrunk and tiny
+text is enlarged before binarization.
+"""
+from threading import Lock
+import cv2
+try:
+    from TranslationWindow.TextRegions import foreground, characterHeight
+except ModuleNotFoundError:
+    from TextRegions import foreground, characterHeight
+
+# median character height in pixels
+TARGET_HEIGHT = 30
+MIN_HEIGHT = 20
+MAX_HEIGHT = 60
+MIN_SCALE = .25
+MAX_SCALE = 4
+# an enlarged capture is never made bigger than this
+MAX_PIXELS = 4000000
+# text height is estimated on a copy no bigger than this
+SAMPLE_PIXELS = 1000000
+
+
+def textHeight(gray):
+    """median height of the characters of a gray image, 0 if it has none"""
+    pixels = gray.shape[0] * gray.shape[1]
+    factor = 1
+    if pixels > SAMPLE_PIXELS:
+        factor = (SAMPLE_PIXELS / pixels) ** .5
+        gray = cv2.resize(gray, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return characterHeight(foreground(binary)) / factor
+
+
+def textScale(gray, target=TARGET_HEIGHT, minHeight=MIN_HEIGHT, maxHeight=MAX_HEIGHT):
+    """the factor that brings the text of a gray image to target, 1 when it is between minHeight and maxHeight"""
+    height = textHeight(gray)
+    if not height or minHeight <= height <= maxHeight:
+        return 1.
+    scale = min(max(target / height, MIN_SCALE), MAX_SCALE)
+    if scale > 1:
+        scale = max(1., min(scale, (MAX_PIXELS / (gray.shape[0] * gray.shape[1])) ** .5))
+    return scale
+
+
+def normalizeResolution(gray, target=TARGET_HEIGHT, minHeight=MIN_HEIGHT, maxHeight=MAX_HEIGHT):
+    """:returns: (resized gray image, scale)"""
+    scale = textScale(gray, target, minHeight, maxHeight)
+    if abs(scale - 1) < .05:
+        return gray, 1.
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=interpolation), scale
+
+
+class OCRSpeed:
+    """Running estimate of OCR seconds per pixel, to tell how much a resize saved"""
+
+    def __init__(self, smoothing=.2):
+        self.smoothing = smoothing
+        self.secondsPerPixel = None
+        self.lock = Lock()
+
+    def update(self, pixels, seconds):
+        if not pixels:
+            return
+        with self.lock:
+            rate = seconds / pixels
+            if self.secondsPerPixel is None:
+                self.secondsPerPixel = rate
+            else:
+                self.secondsPerPixel += self.smoothing * (rate - self.secondsPerPixel)
+
+    def estimate(self, pixels):
+        """seconds OCR would take on that many pixels, None before the first update"""
+        with self.lock:
+            return None if self.secondsPerPixel is None else self.secondsPerPixel * pixels
@@ -0,0 +1,148 @@
+"""
+Narrows a tesseract language set (e.g 'heb+ara+rus+eng') down to the
+languages written in the scripts that actually appear in a capture.
+the scripts are told by tesseract's OSD. without osd.traineddata the
+language set is kept whole.
+"""
+import os
+import bisect
+import cv2
+import modded_pytesseract as tess
+try:
+    from TranslationWindow.TextRegions import detectRegions, foreground, characterHeight
+except ModuleNotFoundError:
+    from TextRegions import detectRegions, foreground, characterHeight
+
+# (first code point, last code point, script) sorted by first code point
+UNICODE_SCRIPTS = sorted([
+    (0x0041, 0x005A, 'Latin'), (0x0061, 0x007A, 'Latin'), (0x00C0, 0x024F, 'Latin'), (0x1E00, 0x1EFF, 'Latin'),
+    (0x0370, 0x03FF, 'Greek'), (0x1F00, 0x1FFF, 'Greek'),
+    (0x0400, 0x052F, 'Cyrillic'),
+    (0x0530, 0x058F, 'Armenian'),
+    (0x0590, 0x05FF, 'Hebrew'), (0xFB1D, 0xFB4F, 'Hebrew'),
+    (0x0600, 0x06FF, 'Arabic'), (0x0750, 0x077F, 'Arabic'), (0xFB50, 0xFDFF, 'Arabic'), (0xFE70, 0xFEFF, 'Arabic'),
+    (0x0700, 0x074F, 'Syriac'),
+    (0x0780, 0x07BF, 'Thaana'),
+    (0x0900, 0x097F, 'Devanagari'),
+    (0x0980, 0x09FF, 'Bengali'),
+    (0x0A00, 0x0A7F, 'Gurmukhi'),
+    (0x0A80, 0x0AFF, 'Gujarati'),
+    (0x0B00, 0x0B7F, 'Oriya'),
+    (0x0B80, 0x0BFF, 'Tamil'),
+    (0x0C00, 0x0C7F, 'Telugu'),
+    (0x0C80, 0x0CFF, 'Kannada'),
+    (0x0D00, 0x0D7F, 'Malayalam'),
+    (0x0D80, 0x0DFF, 'Sinhala'),
+    (0x0E00, 0x0E7F, 'Thai'),
+    (0x0E80, 0x0EFF, 'Lao'),
+    (0x0F00, 0x0FFF, 'Tibetan'),
+    (0x1000, 0x109F, 'Myanmar'),
+    (0x10A0, 0x10FF, 'Georgian'),
+    (0x1100, 0x11FF, 'Hangul'), (0xAC00, 0xD7AF, 'Hangul'),
+    (0x1200, 0x137F, 'Ethiopic'),
+    (0x13A0, 0x13FF, 'Cherokee'),
+    (0x1400, 0x167F, 'Canadian_Aboriginal'),
+    (0x1780, 0x17FF, 'Khmer'),
+    (0x3040, 0x309F, 'Hiragana'),
+    (0x30A0, 0x30FF, 'Katakana'),
+    (0x3400, 0x4DBF, 'Han'), (0x4E00, 0x9FFF, 'Han'),
+])
+SCRIPT_STARTS = [start for start, _, _ in UNICODE_SCRIPTS]
+
+# tesseract language code: the scripts it reads. languages that are not listed are Latin
+LANGUAGE_SCRIPTS = {
+    **dict.fromkeys(('ara', 'fas', 'pus', 'snd', 'uig', 'urd'), {'Arabic'}),
+    **dict.fromkeys(('heb', 'yid'), {'Hebrew'}),
+    **dict.fromkeys(('rus', 'ukr', 'bel', 'bul', 'mkd', 'srp', 'mon', 'tat', 'tgk', 'uzb_cyrl', 'aze_cyrl',
+                     'kaz', 'kir'), {'Cyrillic'}),
+    **dict.fromkeys(('ell', 'grc'), {'Greek'}),
+    **dict.fromkeys(('chi_sim', 'chi_tra', 'chi_sim_vert', 'chi_tra_vert'), {'Han'}),
+    **dict.fromkeys(('jpn', 'jpn_vert'), {'Japanese', 'Han', 'Hiragana', 'Katakana'}),
+    'kor': {'Korean', 'Hangul', 'Han'},
+    **dict.fromkeys(('hin', 'mar', 'nep', 'san'), {'Devanagari'}),
+    **dict.fromkeys(('asm', 'ben'), {'Bengali'}),
+    **dict.fromkeys(('bod', 'dzo'), {'Tibetan'}),
+    **dict.fromkeys(('kat', 'kat_old'), {'Georgian'}),
+    **dict.fromkeys(('amh', 'tir'), {'Ethiopic'}),
+    'guj': {'Gujarati'}, 'pan': {'Gurmukhi'}, 'ori': {'Oriya'}, 'tam': {'Tamil'}, 'tel': {'Telugu'},
+    'kan': {'Kannada'}, 'mal': {'Malayalam'}, 'sin': {'Sinhala'}, 'tha': {'Thai'}, 'lao': {'Lao'},
+    'mya': {'Myanmar'}, 'hye': {'Armenian'}, 'chr': {'Cherokee'}, 'khm': {'Khmer'}, 'syr': {'Syriac'},
+    'div': {'Thaana'}, 'iku': {'Canadian_Aboriginal'},
+}
+LATIN = {'Latin'}
+
+
+def languageScripts(code):
+    return LANGUAGE_SCRIPTS.get(code, LATIN)
+
+
+def characterScript(character):
+    """returns the script of a character or None for digits, punctuation etc."""
+    point = ord(character)
+    i = bisect.bisect_right(SCRIPT_STARTS, point) - 1
+    if i >= 0 and point <= UNICODE_SCRIPTS[i][1]:
+        return UNICODE_SCRIPTS[i][2]
+    return None
+
+
+def osdAvailable():
+    tessdata = os.path.join(os.path.dirname(tess.modded_pytesseract.tesseract_cmd), 'tessdata')
+    return os.path.isfile(os.path.join(tessdata, 'osd.traineddata'))
+
+
+def sample(binary):
+    """a few lines of the largest text block, dark text on a light background"""
+    boxes = detectRegions(binary)
+    if not boxes:
+        return None
+    x, y, w, h = max(boxes[:5], key=lambda box: box[2] * box[3])
+    mask = foreground(binary)
+    h = min(h, characterHeight(mask[y:y + h, x:x + w]) * 4 + 8)
+    return cv2.bitwise_not(mask[y:y + h, x:x + w])
+
+
+def detectScripts(binary, minConfidence=1.5, cancel=None, timeout=0):
+    """
+    Returns the script written in a binarized capture by tesseract's OSD, or None if it can't be told.
+    requires osd.traineddata, see osdAvailable().
+    raises TesseractCancelled and the timeout RuntimeError, they don't tell anything about the capture
+    """
+    image = sample(binary)
+    if image is None:
+        return None
+    try:
+        osd = tess.image_to_osd(image, output_type=tess.Output.DICT, timeout=timeout, cancel=cancel)
+    except tess.TesseractError:
+        return None
+    if osd.get('script_conf', 0) < minConfidence:
+        return None
+    return {osd['script']}
+
+
+def pruneLanguages(binary, lang, cache=None, cancel=None, timeout=0):
+    """
+    :param lang: tesseract language set, e.g 'heb+ara+eng'
+    :param cache: OCRCache that remembers the scripts of a capture
+    :param cancel: CancelToken that stops reading the sample
+    :param timeout: seconds the sample may take, 0 for no limit
+    :returns: the languages of lang whose script appears in the image. lang itself when osd.traineddata
+        isn't installed
+    """
+    codes = lang.split('+')
+    if len({frozenset(languageScripts(code)) for code in codes}) <= 1:
+        return lang  # every language reads the same script, nothing to prune
+    if not osdAvailable():
+        # without OSD the scripts are only told by reading a sample with every model, which is what pruning saves
+        return lang
+
+    scripts = cache.get(binary, 'scripts', lang) if cache is not None else None
+    if scripts is None:
+        detected = detectScripts(binary, cancel=cancel, timeout=timeout)
+        if detected is None:
+            return lang  # not cached, the next read of the capture tries again
+        scripts = sorted(detected)
+        if cache is not None:
+            cache.put(binary, 'scripts', scripts, lang)
+
+    kept = [code for code in codes if languageScripts(code) & set(scripts)]
+    return '+'.join(kept) if kept else lang
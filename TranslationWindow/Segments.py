@@ -0,0 +1,50 @@
+"""
+Splits text into the lines and sentences that are translated and cached on
+their own. captures of menus and tooltips repeat the same strings, each one
+is translated once and only the ones that aren't cached are sent.
+"""
+from collections import Counter
+import re
+
+# a line break or the spaces after the end of a sentence
+BOUNDARY = re.compile(r'(\s*\n\s*|(?<=[.!?。！？])[ \t]+)')
+# a line that ends like this isn't continued by the next one
+LINE_END = re.compile(r'[.!?:;。！？]$')
+
+
+def splitSegments(text):
+    """
+    a line that doesn't end a sentence and is followed by a lowercase one is a
+    wrapped sentence, the two lines are one segment joined by a space
+    :returns: (segments, separators). text is separators[0] + segments[0] + separators[1] + ... + separators[-1]
+    """
+    stripped = text.strip()
+    if not stripped:
+        return [], [text]
+    start = len(text) - len(text.lstrip())
+    parts = BOUNDARY.split(stripped)
+    segments, separators = [parts[0]], [text[:start]]
+    for separator, segment in zip(parts[1::2], parts[2::2]):
+        if '\n' in separator and not LINE_END.search(segments[-1]) and segment[:1].islower():
+            segments[-1] += ' ' + segment
+        else:
+            separators.append(separator)
+            segments.append(segment)
+    separators.append(text[start + len(stripped):])
+    return segments, separators
+
+
+def joinSegments(segments, separators):
+    """the inverse of splitSegments, with other (e.g translated) segments"""
+    return separators[0] + ''.join(segment + separator for segment, separator in zip(segments, separators[1:]))
+
+
+def mainLanguage(segments, languages):
+    """
+    :param languages: {segment: language}
+    :returns: the language of most of the text
+    """
+    counts = Counter()
+    for segment in segments:
+        counts[languages[segment]] += len(segment)
+    return counts.most_common(1)[0][0]
@@ -0,0 +1,133 @@
+"""
+Starts translating the first OCR variant that is confident enough while the
+other variants are still read, so OCR and the translation service work at
+the same time instead of one after the other. when another variant wins,
+its lines that the speculation already translated come from the translation
+cache and only the differing ones are sent.
+"""
+from concurrent.futures import Future
+from threading import Lock
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+USED = 'used'  # the winner's text is the speculated one
+RETRANSLATED = 'retranslated'  # the winner shares lines with the speculated text
+WASTED = 'wasted'  # the winner shares no line with it, the speculation is cancelled
+NONE = 'none'  # no variant was confident enough
+
+
+def relay(source, target):
+    """completes the future target the way source was completed, unless target was cancelled"""
+    if target.cancelled():
+        return
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+class SpeculationStats:
+    def __init__(self):
+        self.lock = Lock()
+        self.outcomes = {USED: 0, RETRANSLATED: 0, WASTED: 0, NONE: 0}
+        self.savedSeconds = 0.
+
+    def record(self, outcome, saved=0.):
+        with self.lock:
+            self.outcomes[outcome] += 1
+            self.savedSeconds += saved
+
+    def stats(self):
+        """how often the speculation was used and the translation time it hid behind OCR"""
+        with self.lock:
+            speculated = self.outcomes[USED] + self.outcomes[RETRANSLATED] + self.outcomes[WASTED]
+            return dict(self.outcomes,
+                        usedRate=self.outcomes[USED] / speculated if speculated else 0,
+                        savedSeconds=self.savedSeconds,
+                        meanSavedSeconds=self.savedSeconds / self.outcomes[USED] if self.outcomes[USED] else 0)
+
+
+class SpeculativeTranslation:
+    def __init__(self, submit, translate, args=(), floor=60, stats=None):
+        """
+        :param submit: function(function, *args) that returns a concurrent.futures.Future,
+            e.g TranslationEngine.submit
+        :param translate: function(text, *args) that translates OCR text
+        :param floor: mean OCR confidence of a variant that is worth translating before OCR is done
+        :param stats: SpeculationStats the outcome is recorded in
+        """
+        self.submit = submit
+        self.translate = translate
+        self.args = args
+        self.floor = floor
+        self.stats = stats
+        self.lock = Lock()
+        self.finished = False  # a variant read after finish() is too late to speculate on
+        self.text = None
+        self.future = None
+        self.started = None
+        self.translated = None
+
+    def offer(self, text, confidence):
+        """called with every OCR variant as soon as it is read, the first confident one is translated"""
+        with self.lock:
+            if self.finished or self.future is not None or confidence < self.floor or not text.strip():
+                return
+            self.text = text
+            self.started = time.perf_counter()
+            self.future = self.submit(self.translate, text, *self.args)
+        self.future.add_done_callback(self.done)
+        logger.debug('speculatively translating a variant with confidence %.2f', confidence)
+
+    def done(self, future):
+        self.translated = time.perf_counter()
+
+    def retranslate(self, text):
+        """
+        translates text once the speculation is done, the lines they share are cached by then.
+        it is submitted from the speculation's done callback, so no worker waits for the speculation
+        :returns: concurrent.futures.Future of the translation
+        """
+        result = Future()
+
+        def submit(_):
+            if not result.cancelled():
+                self.submit(self.translate, text, *self.args).add_done_callback(lambda future: relay(future, result))
+        self.future.add_done_callback(submit)
+        return result
+
+    def cancel(self):
+        """OCR failed, the speculation is dropped"""
+        with self.lock:
+            self.finished = True
+            future = self.future
+        if future is not None:
+            future.cancel()
+
+    def finish(self, text):
+        """
+        :param text: the text OCR settled on
+        :returns: concurrent.futures.Future of its translation
+        """
+        ocrDone = time.perf_counter()
+        with self.lock:
+            self.finished = True
+            future, speculated = self.future, self.text
+        if future is None:
+            outcome, saved, result = NONE, 0., self.submit(self.translate, text, *self.args)
+        elif text == speculated:
+            outcome, saved, result = USED, min(self.translated or ocrDone, ocrDone) - self.started, future
+        elif set(text.splitlines()) & set(speculated.splitlines()):
+            outcome, saved, result = RETRANSLATED, 0., self.retranslate(text)
+        else:
+            future.cancel()
+            outcome, saved, result = WASTED, 0., self.submit(self.translate, text, *self.args)
+        if self.stats is not None:
+            self.stats.record(outcome, saved)
+        logger.info('speculative translation %s, %.2fs saved. speculation so far: %s', outcome, saved,
+                    self.stats.stats() if self.stats is not None else {})
+        return result
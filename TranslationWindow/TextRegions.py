@@ -0,0 +1,115 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
+import numpy
+import cv2
+import modded_pytesseract as tess
+from modded_pytesseract.pool import TSV_HEADER
+
+# captures smaller than this are read whole, splitting them costs more than it saves
+MIN_PIXELS = 250000
+MARGIN = 4
+
+executor = ThreadPoolExecutor(os.cpu_count() or 2)
+
+
+def foreground(binary):
+    """returns the image with white text on a black background"""
+    if cv2.mean(binary)[0] > 127:
+        return cv2.bitwise_not(binary)
+    return binary
+
+
+def characterHeight(mask):
+    """median height of the connected components that are big enough to be characters"""
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT][stats[1:, cv2.CC_STAT_AREA] >= 4]
+    return int(numpy.median(heights)) if len(heights) else 0
+
+
+def readingOrder(boxes):
+    """sorts (x, y, w, h) boxes into rows from top to bottom and every row from left to right"""
+    rows = []
+    for box in sorted(boxes, key=lambda b: b[1]):
+        center = box[1] + box[3] / 2
+        for row in rows:
+            if row['top'] <= center <= row['bottom']:
+                row['boxes'].append(box)
+                row['bottom'] = max(row['bottom'], box[1] + box[3])
+                break
+        else:
+            rows.append({'top': box[1], 'bottom': box[1] + box[3], 'boxes': [box]})
+    return [box for row in rows for box in sorted(row['boxes'], key=lambda b: b[0])]
+
+
+def detectRegions(binary):
+    """returns the (x, y, w, h) boxes of the text blocks of a binarized image in reading order"""
+    mask = foreground(binary)
+    height = characterHeight(mask)
+    if not height:
+        return []
+
+    # smear characters into words and words into blocks
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (int(height * 1.2) + 1, int(height * .5) + 1))
+    blocks = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    contours = cv2.findContours(blocks, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[-2]
+
+    imageHeight, imageWidth = binary.shape[:2]
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if h < 4 or w < 4 or not cv2.countNonZero(mask[y:y + h, x:x + w]):
+            continue
+        x0, y0 = max(x - MARGIN, 0), max(y - MARGIN, 0)
+        x1, y1 = min(x + w + MARGIN, imageWidth), min(y + h + MARGIN, imageHeight)
+        boxes.append((x0, y0, x1 - x0, y1 - y0))
+    return readingOrder(boxes)
+
+
+def emptyData():
+    return tess.tsv_to_columns(TSV_HEADER)
+
+
+def recognizeRegions(image, recognize, onRegion=None):
+    """
+    Reads every text block of the image on its own, concurrently.
+    :param recognize: function(image) -> (tsv dict, text)
+    :param onRegion: function(tsv dict) called with every block in reading order, as soon as it and
+        the blocks before it are read
+    :returns: (tsv dict, text, [{'box': (x, y, w, h), 'seconds': float}])
+        boxes of the tsv dict are relative to the whole image
+    """
+    if image.shape[0] * image.shape[1] < MIN_PIXELS:
+        data, text = recognize(image)
+        if onRegion is not None:
+            onRegion(data)
+        return data, text, []
+
+    boxes = detectRegions(image)
+    if not boxes:
+        return emptyData(), '', []
+
+    def read(box):
+        x, y, w, h = box
+        start = time.perf_counter()
+        result = recognize(numpy.ascontiguousarray(image[y:y + h, x:x + w]))
+        return result, time.perf_counter() - start
+
+    columns, texts, regions = {head: [values] for head, values in emptyData().items()}, [], []
+    blockOffset = 0
+    for box, ((regionData, text), seconds) in zip(boxes, executor.map(read, boxes)):
+        regions.append({'box': box, 'seconds': seconds})
+        if onRegion is not None:
+            onRegion(regionData)
+        if text.strip():
+            texts.append(text)
+        columns['left'].append(regionData['left'] + box[0])
+        columns['top'].append(regionData['top'] + box[1])
+        columns['block_num'].append(regionData['block_num'] + blockOffset)
+        for head in columns.keys() - {'left', 'top', 'block_num'}:
+            columns[head].append(regionData[head])
+        if len(regionData['block_num']):
+            blockOffset = max(blockOffset, int(columns['block_num'][-1].max()))
+    data = {head: sum(values, []) if head == 'text' else numpy.concatenate(values)
+            for head, values in columns.items()}
+    return data, '\n'.join(texts), regions
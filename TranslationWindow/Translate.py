@@ -1,103 +1,121 @@
 import io
 from PyQt5.QtCore import QBuffer
-from threading import Thread
+from imagebridge import qpixmapView
+from threading import Thread, Lock
 import modded_pytesseract as tess
-from googletrans import Translator, LANGUAGES
+from googletrans import LANGUAGES
 import cv2
 from os import startfile
 import numpy
+import logging
 try:
     from ISO_converter import ISO_2_TO_3, ENGLISH_3, ISO_3_TO_2
 except ModuleNotFoundError:
     from SettingsDialog.ISO_converter import ISO_2_TO_3, ENGLISH_3, ISO_3_TO_2
-
-
-def generate_translator():
-    return Translator(['translate.googleapis.com'])
+try:
+    from TranslationWindow.OCRScheduler import VariantScheduler
+    from TranslationWindow.OCRPipeline import OCRRequest, VARIANTS
+    from TranslationWindow.OCRCache import OCRCache
+    from TranslationWindow.TranslationCache import TranslationCache
+    from TranslationWindow.Segments import splitSegments, joinSegments, mainLanguage
+    from TranslationWindow.HTTPClient import ManagedClient
+    from TranslationWindow.Backends import BACKENDS, BackendRouter, Translation
+    from TranslationWindow.TranslationEngine import TranslationEngine
+    from TranslationWindow.Speculation import SpeculativeTranslation, SpeculationStats
+    from TranslationWindow.LanguageID import LanguageIdentifier
+    from TranslationWindow.OCRProcesses import OCRProcessPool, BrokenProcessPool
+    from TranslationWindow.Resolution import OCRSpeed
+    from TranslationWindow.WarmUp import WarmUpService, TRANSLATOR
+    from TranslationWindow.Presets import getPreset, engineConfig, DEFAULT
+except ModuleNotFoundError:
+    from OCRScheduler import VariantScheduler
+    from OCRPipeline import OCRRequest, VARIANTS
+    from OCRCache import OCRCache
+    from TranslationCache import TranslationCache
+    from Segments import splitSegments, joinSegments, mainLanguage
+    from HTTPClient import ManagedClient
+    from Backends import BACKENDS, BackendRouter, Translation
+    from TranslationEngine import TranslationEngine
+    from Speculation import SpeculativeTranslation, SpeculationStats
+    from LanguageID import LanguageIdentifier
+    from OCRProcesses import OCRProcessPool, BrokenProcessPool
+    from Resolution import OCRSpeed
+    from WarmUp import WarmUpService, TRANSLATOR
+    from Presets import getPreset, engineConfig, DEFAULT
+
+
+logger = logging.getLogger(__name__)
+# the online backends make their requests through this client
+httpClient = ManagedClient()
+
+
+def loadBackends(names=('phrasebook', 'google')):
+    """the registered translation backends called names, in the order the router prefers them when it has no latency"""
+    options = {'google': {'client': httpClient}}
+    backends = []
+    for name in names:
+        try:
+            backends.append(BACKENDS[name](**options.get(name, {})))
+        except (OSError, ValueError) as e:
+            logger.warning('translation backend %s unavailable: %s', name, e)
+    return backends
 
 
 tess.modded_pytesseract.tesseract_cmd = r'tesseract2\tesseract.exe'
-trans = generate_translator()
+# warm tesseract workers, only when libtesseract loads. without it every pass runs the executable
+workerPool = tess.TesseractPool()
+tess.modded_pytesseract.worker_pool = workerPool if workerPool.available() else None
+router = BackendRouter(loadBackends())
+# the windows translate through the engine, Translate* functions are called on its workers
+engine = TranslationEngine(workers=httpClient.connections)
+speculationStats = SpeculationStats()
+# mean OCR confidence of the first variant that is translated before OCR is done
+SPECULATION_FLOOR = 60
+scheduler = VariantScheduler()
+ocrCache = OCRCache(path=OCRCache.cacheDatabasePath)
+translationCache = TranslationCache(path=TranslationCache.cacheDatabasePath)
+# the lines of live captures change with every OCR pass, their translations are kept in memory only
+lineCache = TranslationCache()
+processPool = OCRProcessPool()
+ocrSpeed = OCRSpeed()
+# the preset whose models warmUpOCR() keeps loaded
+warmPreset = DEFAULT
+# the newest OCRRequest made by supersede(). a new capture cancels the one before it
+latestRequest = None
+latestLock = Lock()
 languages = LANGUAGES
 languages['auto'] = 'Auto'
+# picks the direction of a capture's translation before it is sent
+languageIdentifier = LanguageIdentifier([code for code in languages if code != 'auto'])
 
 
-class TextRecognizer:
-    texts = []
-    lang = ''
-    config = ''
-
-    def __init__(self, img, name=''):
-        self.name = name
-        self.image = img
-        self.dict, self.text = tess.image_to_data_and_text(self.image, self.lang, self.config)
-        self.texts.append(self)
-
-    def getAverageConfidence(self):
-        return self.avg([self.dict['conf'][i] for i in range(len(self.dict['conf']))
-                         if not self.dict['conf'][i] == '-1'])
-
-    def getText(self):
-        return self.text
-
-    def __str__(self):
-        return "" + \
-               self.name + ":" + '\n' + \
-               "confident: " f"{self.getAverageConfidence():.2f}" + '\n'
-
-    @staticmethod
-    def avg(lst):
-        try:
-            return sum(lst) / len(lst)
-        except ZeroDivisionError:
-            return -1
-
-    @classmethod
-    def mostReliable(cls):
-        return max(cls.texts, key=lambda x: x.getAverageConfidence())
-
-    @classmethod
-    def clear(cls):
-        cls.texts.clear()
+def recordRequest(request):
+    """records which variant won a request that was read and how fast OCR was, in whichever process it ran"""
+    if request.winner is not None:
+        scheduler.record(request.winner, request.tried)
+        request.reportResize(ocrSpeed)
+    if logger.isEnabledFor(logging.DEBUG):
+        pool = tess.modded_pytesseract.worker_pool
+        logger.debug('OCR worker pool: %s, OCR cache: %s', None if pool is None else pool.stats(), ocrCache.stats())
 
 
-class TextRecognizerThread(Thread):
-    def __init__(self, img, name='', start_now=True):
-        super(TextRecognizerThread, self).__init__()
-        self.image = img
-        self.name = name
-        if start_now:
-            self.start()
-
-    def run(self):
-        TextRecognizer(self.image, self.name)
+def supersede(request):
+    """makes request the latest one and cancels the one it replaces if it is still running"""
+    global latestRequest
+    with latestLock:
+        previous, latestRequest = latestRequest, request
+    if previous is not None and previous.result is None:
+        logger.info('OCR request superseded by a newer capture')
+        previous.cancel()
 
 
 def convertQImageToMat(incomingImage):
-    """ Converts a QImage into an opencv MAT format  """
-
-    incomingImage = incomingImage.toImage().convertToFormat(4)
-
-    width = incomingImage.width()
-    height = incomingImage.height()
-
-    ptr = incomingImage.bits()
-    ptr.setsize(incomingImage.byteCount())
-    arr = numpy.array(ptr).reshape(height, width, 4)  # Copies the data
-
-    return arr
-
+    """ Returns a read only BGRA opencv MAT view of a QPixmap's pixels """
+    return qpixmapView(incomingImage)
 
-def improveImage(img):
-    gray = cv2.cvtColor(convertQImageToMat(img), cv2.COLOR_BGR2GRAY)
 
-    thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
-    thresh2 = cv2.threshold(gray, 220, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_BINARY)[1]
-
-    return thresh, thresh2
-
-
-def TranslateFromImage(image, destination: str = 'he', src: str = 'auto', imsource=None):
+def getOCRLanguages(destination: str = 'he', src: str = 'auto', imsource=None):
+    """returns the tesseract language set (e.g 'heb+eng') used to read an image"""
     if imsource is not None:
         imsource = [i for i in imsource if i in ISO_3_TO_2]
 
@@ -110,40 +128,125 @@ def TranslateFromImage(image, destination: str = 'he', src: str = 'auto', imsour
         if 'eng' not in imsource:
             imsource.append('eng')
 
-    improved = improveImage(image)
+    return '+'.join(imsource)
 
-    TextRecognizer.clear()
-    TextRecognizer.lang = '+'.join(imsource)
-    TextRecognizer.config = '--psm 6'
-    threads = [
-        TextRecognizerThread(improved[0], 'first'),
-        TextRecognizerThread(improved[1], 'second'),
-        TextRecognizerThread(255 - improved[0], 'third'),
-        TextRecognizerThread(255 - improved[1], 'fourth')
-    ]
-    for thread in threads:
-        thread.join()
 
-    final_result = TextRecognizer.mostReliable().getText()
+def warmLanguages(lang):
+    """reads a small blank image at low priority, so tesseract loads the models of the language set"""
+    config = '--psm 6' + engineConfig(getPreset(warmPreset))
+    if tess.modded_pytesseract.worker_pool is not None:
+        try:
+            tess.modded_pytesseract.worker_pool.warm(lang, config)
+        except tess.PoolUnavailable as e:
+            logger.debug('OCR worker pool unavailable: %s', e)
+    tess.image_to_data_and_text(numpy.full((32, 96), 255, numpy.uint8), lang, config, nice=10, timeout=30)
+
+
+def warmTranslator():
+    router.warm()
+
+
+warmUpService = WarmUpService(warmLanguages, warmTranslator)
+
+
+def warmUpOCR(settings: dict):
+    """keeps the models of the configured languages and the translation client warm in the background"""
+    global warmPreset
+    warmPreset = settings['preset']
+    lang = getOCRLanguages(settings['dest'], settings['source'], settings['imsource'])
+    warmUpService.configure([lang], settings['warmUpIdle'] * 60)
+
+
+def startOCR(settings: dict):
+    """starts the OCR worker processes the settings ask for and warms up everything"""
+    processPool.size = settings['ocrProcesses']
+    if processPool.size:
+        Thread(target=processPool.start, daemon=True).start()
+    warmUpOCR(settings)
+
+
+def TranslateFromImage(image, destination: str = 'he', src: str = 'auto', imsource=None, threshold=None,
+                       psm='auto', onLine=None, timeout=0, preset=DEFAULT, onCandidate=None):
+    """
+    :param threshold: mean OCR confidence that is good enough to skip the remaining variants
+    :param psm: page segmentation mode setting, one of PageSegmentation.MODES
+    :param onLine: function(text, confidence) that gets the lines of the capture while OCR is still running.
+        captures read by the worker processes yield their text only at the end
+    :param timeout: seconds OCR may take, 0 for no limit
+    :param preset: name of the OCR pipeline in Presets.PRESETS
+    :param onCandidate: function(text, confidence) called with every OCR variant as soon as it is read, e.g
+        SpeculativeTranslation.offer. not called for captures read by the worker processes
+    raises TesseractCancelled when a newer capture supersedes this one before its text is read
+    """
+    mat = convertQImageToMat(image)
+    request = OCRRequest(mat, getOCRLanguages(destination, src, imsource), psm, threshold, onLine, timeout, preset,
+                         onCandidate, scheduler.order(VARIANTS), ocrCache)
+    supersede(request)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('OCR models of %s were %s', request.languages,
+                     warmUpService.state().get(request.languages, {}).get('state', 'cold'))
+    warmUpService.touch(request.languages)
+    if processPool.running():
+        # the workers have no cache, the capture is looked up and stored here
+        request.result = ocrCache.get(mat, 'capture', request.languages, request.cacheOptions())
+        if request.result is None:
+            try:
+                request.update(processPool.read(mat, request.languages, psm, threshold, timeout,
+                                                request.cancelToken, preset, request.order))
+            except BrokenProcessPool as e:
+                logger.warning('OCR worker processes died, reading in this process from now on: %s', e)
+                processPool.shutdown()
+            else:
+                if request.cancelToken.cancelled:
+                    raise tess.TesseractCancelled()
+                ocrCache.put(mat, 'capture', request.result, request.languages, request.cacheOptions())
+    final_result = request.result if request.result is not None else request.run()
+    recordRequest(request)
 
     yield final_result
 
+    t = detectedTranslation(final_result, destination, src)
+
+    yield t.text, t.src, t.dest
+
+    yield t.pronunciation
+
+
+def detectedTranslation(text, destination, src):
+    """
+    translates text read from a capture. text that is already in destination is translated to src.
+    the language is told locally first, the service detects it only when the identifier can't tell
+    """
+    if src == 'auto':
+        return translate(text, src='auto', dest=destination)
+    written = languageIdentifier.isLanguage(text, destination)
+    if written:
+        return translate(text, dest=src, src=destination)
+
     t = translate(
-        final_result,
+        text,
         src='auto',
         dest=destination
     )
-
-    if languages[t.src] == languages[t.dest] and not src == 'auto':
+    if languages[t.src] == languages[t.dest]:
+        if written is False:
+            logger.info('the text was taken for not %s, translating it again', destination)
         t = translate(
-            final_result,
+            text,
             dest=src,
             src=destination
         )
+    return t
 
-    yield t.text, t.src, t.dest
 
-    yield t.pronunciation
+def TranslateDetected(text, destination: str = 'he', src: str = 'auto'):
+    t = detectedTranslation(text, destination, src)
+    return text, t.text, t.src, t.dest
+
+
+def speculate(destination, src, floor=SPECULATION_FLOOR):
+    """a SpeculativeTranslation of a capture by TranslateDetected, to offer its OCR variants to"""
+    return SpeculativeTranslation(engine.submit, TranslateDetected, (destination, src), floor, speculationStats)
 
 
 def TranslateFromText(text, destination: str = 'he', src: str = 'auto'):
@@ -155,23 +258,115 @@ def TranslateFromText(text, destination: str = 'he', src: str = 'auto'):
     return text, t.text, t.src, t.dest
 
 
-def translate(text, dest, src):
-    global trans
-    try:
-        t = trans.translate(
-            text,
-            dest=dest,
-            src=src
-        )
-    except Exception as e:
-        print(e)
-        trans = generate_translator()
-        t = trans.translate(
-            text,
-            dest=dest,
-            src=src
-        )
+def requestTranslation(text, dest, src):
+    """
+    a single translation by the fastest healthy backend. raises the error of
+    the last backend that failed, Backends.Unsupported when none could translate
+    """
+    t = router.translate(
+        text,
+        dest=dest,
+        src=src
+    )
+    warmUpService.touch(TRANSLATOR)
+    if logger.isEnabledFor(logging.DEBUG):
+        # the stats are built under the locks of the router and the client, only when they are logged
+        logger.debug('translated by %s. backends: %s, translation client: %s', t.backend, router.stats(),
+                     httpClient.stats())
     return t
 
+
+def translationDict(t, origin, text, pronunciation):
+    return {'src': t.src, 'dest': t.dest, 'origin': origin, 'text': text, 'pronunciation': pronunciation}
+
+
+def translateSegments(segments, dest, src):
+    """
+    translates the segments in one request, as the lines of a single text
+    :returns: [translation dict of every segment]
+    """
+    t = requestTranslation('\n'.join(segments), dest, src)
+    lines = t.text.split('\n')
+    if len(lines) == len(segments):
+        pronunciations = t.pronunciation.split('\n') if isinstance(t.pronunciation, str) else []
+        if len(pronunciations) != len(segments):
+            pronunciations = [None] * len(segments)
+        return [translationDict(t, segment, line.strip(), pronunciation)
+                for segment, line, pronunciation in zip(segments, lines, pronunciations)]
+    logger.info('the translation of %d segments lost their line breaks, translating them one by one', len(segments))
+    singles = [requestTranslation(segment, dest, src) for segment in segments]
+    return [translationDict(single, segment, single.text, single.pronunciation)
+            for segment, single in zip(segments, singles)]
+
+
+def translate(text, dest, src, cache=True):
+    """
+    Translates the lines and sentences of the text. every distinct one is
+    translated once, and only the ones that aren't in translationCache are
+    sent, all in a single request.
+    :param cache: True for translationCache, another TranslationCache, e.g lineCache, or False to always
+        ask the translation service
+    """
+    return translateTexts([text], dest, src, cache)[0]
+
+
+def translateTexts(texts, dest, src, cache=True):
+    """
+    translate() of several texts, their segments are sent in a single request
+    :returns: [Translation of every text]
+    """
+    cache = translationCache if cache is True else cache or None
+    split = [splitSegments(text) for text in texts]
+    unique = list(dict.fromkeys(segment for segments, _ in split for segment in segments))
+    results = {}
+    if cache is not None:
+        for segment in unique:
+            cached = cache.get(segment, src, dest)
+            if cached is not None:
+                results[segment] = cached
+    misses = [segment for segment in unique if segment not in results]
+    if misses:
+        for segment, result in zip(misses, translateSegments(misses, dest, src)):
+            results[segment] = result
+            if cache is not None:
+                cache.put(segment, src, dest, result)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('translated %d segments, %d distinct, %d sent. translation cache: %s',
+                     sum(len(segments) for segments, _ in split), len(unique), len(misses),
+                     None if cache is None else cache.stats())
+    return [joinTranslation(text, segments, separators, results, dest, src)
+            for text, (segments, separators) in zip(texts, split)]
+
+
+def joinTranslation(text, segments, separators, results, dest, src):
+    """the Translation of text from the translation dicts of its segments"""
+    if not segments:
+        return Translation(src=src, dest=dest, origin=text, text=text, pronunciation=None)
+    pronunciations = [results[segment]['pronunciation'] for segment in segments]
+    if len(segments) == 1:
+        pronunciation = pronunciations[0]
+    elif all(isinstance(pronunciation, str) for pronunciation in pronunciations):
+        pronunciation = joinSegments(pronunciations, separators)
+    else:
+        pronunciation = None
+    return Translation(src=mainLanguage(segments, {segment: results[segment]['src'] for segment in segments}),
+                       dest=results[segments[0]]['dest'], origin=text,
+                       text=joinSegments([results[segment]['text'] for segment in segments], separators),
+                       pronunciation=pronunciation)
+
+
+def TranslateLines(text, destination: str = 'he', src: str = 'auto'):
+    """
+    translates every line of text on its own, in a single request. the lines are partial OCR results,
+    so they are cached in lineCache and not on disk
+    :returns: (text, translation, source language, destination language). the translation has a line for every line
+    """
+    lines = text.split('\n')
+    translations = translateTexts(lines, destination, src, lineCache)
+    lineLanguages = {line: t.src for line, t in zip(lines, translations) if line.strip()}
+    return (text, '\n'.join(' '.join(t.text.split('\n')) for t in translations),
+            mainLanguage(list(lineLanguages), lineLanguages) if lineLanguages else src, destination)
+
+
 def openImage(path):
     startfile(path)
@@ -0,0 +1,200 @@
+from collections import OrderedDict
+from threading import Lock
+import hashlib
+import sqlite3
+import json
+import time
+import unicodedata
+
+
+class TranslationCache:
+    """
+    Caches translations by their normalized text and languages.
+    The first tier is a bounded in-memory LRU, the optional second tier is a
+    size capped SQLite file that survives restarts. entries of both tiers
+    expire after ttl seconds, so corrections of the translation service
+    eventually reach the user.
+    """
+    cacheDatabasePath = 'data\\translation_cache.sqlite'
+
+    def __init__(self, size=512, path=None, maxBytes=4 * 1024 * 1024, ttl=30 * 24 * 60 * 60):
+        """
+        :param size: number of translations kept in memory
+        :param path: path of the SQLite tier. None keeps the cache in memory only
+        :param maxBytes: size cap of the SQLite tier
+        :param ttl: seconds a translation is used for, 0 keeps it forever
+        """
+        self.size = size
+        self.maxBytes = maxBytes
+        self.ttl = ttl
+        # {key: (created time.time(), value)}
+        self.memory = OrderedDict()
+        self.lock = Lock()
+        self.memoryHits = 0
+        self.diskHits = 0
+        self.expired = 0
+        self.misses = 0
+        # {key: time.time() of its last hit} of the rows used since the last write, see flushUses()
+        self.uses = {}
+
+        self.connection = None
+        if path is not None:
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute('CREATE TABLE IF NOT EXISTS cache ('
+                                    'key TEXT PRIMARY KEY, value TEXT, size INTEGER, created REAL, used REAL)')
+            self.connection.commit()
+
+    @staticmethod
+    def normalize(text):
+        """the text with its lines stripped and the whitespace inside them collapsed"""
+        text = unicodedata.normalize('NFC', text)
+        return '\n'.join(' '.join(line.split()) for line in text.strip().splitlines())
+
+    @classmethod
+    def key(cls, text, src, dest):
+        return hashlib.sha1('\0'.join((src, dest, cls.normalize(text))).encode('utf-8')).hexdigest()
+
+    def fresh(self, created, now):
+        return not self.ttl or now - created < self.ttl
+
+    def get(self, text, src, dest):
+        """
+        returns the cached translation or None
+        :param src: source language as it was asked for, 'auto' included
+        """
+        key = self.key(text, src, dest)
+        now = time.time()
+        expired = False  # a lookup counts once, as a hit, an expired entry or a miss
+        with self.lock:
+            if key in self.memory:
+                created, value = self.memory[key]
+                if self.fresh(created, now):
+                    self.memory.move_to_end(key)
+                    self.memoryHits += 1
+                    # the row's last use decides the disk tier's eviction, it has to see the memory hits too
+                    self.touch(key, now)
+                    return value
+                del self.memory[key]
+                expired = True
+
+            row = self.diskGet(key)
+            if row is not None:
+                created, value = row
+                if self.fresh(created, now):
+                    self.diskHits += 1
+                    self.remember(key, value, created)
+                    return value
+                self.diskDelete(key)
+                expired = True
+
+            if expired:
+                self.expired += 1
+            else:
+                self.misses += 1
+            return None
+
+    def put(self, text, src, dest, value):
+        """:param value: JSON serializable translation"""
+        key = self.key(text, src, dest)
+        now = time.time()
+        with self.lock:
+            self.remember(key, value, now)
+            self.diskPut(key, value, now)
+
+    def remember(self, key, value, created):
+        self.memory[key] = (created, value)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.size:
+            self.memory.popitem(last=False)
+
+    def diskGet(self, key):
+        if self.connection is None:
+            return None
+        row = self.connection.execute('SELECT created, value FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        self.touch(key, time.time())
+        return row[0], json.loads(row[1])
+
+    def touch(self, key, now):
+        """
+        remembers that the row of key was used. lookups don't write to the file, the uses are
+        flushed with the next write that commits anyway
+        """
+        if self.connection is not None:
+            self.uses[key] = now
+
+    def flushUses(self):
+        """writes the last uses of the rows, the caller commits"""
+        if self.uses:
+            self.connection.executemany('UPDATE cache SET used = ? WHERE key = ?',
+                                        [(used, key) for key, used in self.uses.items()])
+            self.uses.clear()
+
+    def diskDelete(self, key):
+        if self.connection is None:
+            return
+        self.uses.pop(key, None)
+        self.flushUses()
+        self.connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+        self.connection.commit()
+
+    def diskPut(self, key, value, now):
+        if self.connection is None:
+            return
+        value = json.dumps(value)
+        self.uses.pop(key, None)
+        # the eviction below goes by the last uses, they have to be written first
+        self.flushUses()
+        self.connection.execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)',
+                                (key, value, len(value), now, now))
+        if self.ttl:
+            self.connection.execute('DELETE FROM cache WHERE created < ?', (now - self.ttl,))
+        total = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM cache').fetchone()[0]
+        if total > self.maxBytes:
+            # evict the least recently used rows until the file fits its cap again
+            excess = total - self.maxBytes
+            evicted = []
+            for oldKey, size in self.connection.execute('SELECT key, size FROM cache ORDER BY used'):
+                if excess <= 0:
+                    break
+                evicted.append((oldKey,))
+                excess -= size
+            self.connection.executemany('DELETE FROM cache WHERE key = ?', evicted)
+        self.connection.commit()
+
+    def entries(self):
+        """number of translations in the larger tier"""
+        if self.connection is None:
+            return len(self.memory)
+        return self.connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def stats(self):
+        with self.lock:
+            hits = self.memoryHits + self.diskHits
+            lookups = hits + self.expired + self.misses
+            return {
+                'memoryHits': self.memoryHits,
+                'diskHits': self.diskHits,
+                'expired': self.expired,
+                'misses': self.misses,
+                'hitRate': hits / lookups if lookups else 0,
+                'entries': self.entries(),
+            }
+
+    def close(self):
+        """writes the last uses of the rows and closes the SQLite tier"""
+        with self.lock:
+            if self.connection is not None:
+                self.flushUses()
+                self.connection.commit()
+                self.connection.close()
+                self.connection = None
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            self.uses.clear()
+            if self.connection is not None:
+                self.connection.execute('DELETE FROM cache')
+                self.connection.commit()
@@ -0,0 +1,84 @@
+"""
+Runs translations for the windows on a single asyncio event loop thread
+instead of a QThread per translation. identical translations that are in
+flight at the same time are made once, and a request can be cancelled
+until its result is ready.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread, Lock
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TranslationEngine:
+    def __init__(self, workers=4):
+        """
+        :param workers: translations made at the same time. the backends block, every one of them
+            holds a worker (and a connection of the shared HTTP client) while it waits for the service
+        """
+        self.workers = workers
+        self.loop = None
+        self.thread = None
+        self.executor = None
+        self.lock = Lock()
+        # {(function, args): asyncio future of the call} of the calls in flight, and how many requests wait for each
+        self.inflight = {}
+        self.waiters = {}
+
+    def start(self):
+        with self.lock:
+            if self.loop is not None:
+                return
+            self.loop = asyncio.new_event_loop()
+            self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix='translation')
+            self.loop.set_default_executor(self.executor)
+            self.thread = Thread(target=self.loop.run_forever, name='translation loop', daemon=True)
+        self.thread.start()
+
+    def submit(self, function, *args):
+        """
+        calls function(*args) for the caller. the arguments must be hashable
+        :returns: concurrent.futures.Future. cancelling it drops the result, and the call
+            itself when it hasn't started and no other request waits for it
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self.call(function, args), self.loop)
+
+    async def call(self, function, args):
+        key = (function, args)
+        shared = self.inflight.get(key)
+        if shared is None:
+            shared = self.loop.run_in_executor(None, function, *args)
+            self.inflight[key] = shared
+            shared.add_done_callback(lambda _: self.inflight.pop(key, None))
+        else:
+            logger.debug('joined a translation in flight')
+        self.waiters[key] = self.waiters.get(key, 0) + 1
+        try:
+            # a cancelled request doesn't cancel the call the other requests wait for
+            return await asyncio.shield(shared)
+        finally:
+            self.waiters[key] -= 1
+            if not self.waiters[key]:
+                del self.waiters[key]
+                if not shared.done():
+                    shared.cancel()
+
+    def stats(self):
+        """{'inflight': calls in flight, 'waiting': requests waiting for them}, read on the loop thread"""
+        if self.loop is None:
+            return {'inflight': 0, 'waiting': 0}
+
+        async def count():
+            return {'inflight': len(self.inflight), 'waiting': sum(self.waiters.values())}
+        return asyncio.run_coroutine_threadsafe(count(), self.loop).result()
+
+    def stop(self):
+        with self.lock:
+            if self.loop is None:
+                return
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.executor.shutdown(wait=False)
+            self.loop = None
@@ -3,6 +3,7 @@ try:
 except ModuleNotFoundError:
     from TranslationWindowUI import Ui_Dialog
 from PyQt5 import QtWidgets, QtCore, QtGui
+from functools import partial
 
 try:
     import TranslationWindow.Translate as Translate
@@ -10,6 +11,12 @@ except ModuleNotFoundError:
     import Translate
 
 
+# lines the live translation of a window remembers before it starts over
+LINE_MEMO_SIZE = 1000
+# milliseconds the lines read from a capture are collected before they are translated together
+LINE_BATCH = 50
+
+
 class TranslationWindow(QtWidgets.QDialog, Ui_Dialog):
     def __init__(self, settings: dict, parent=None, image=None, title=''):
         super(TranslationWindow, self).__init__(parent)
@@ -17,7 +24,23 @@ class TranslationWindow(QtWidgets.QDialog, Ui_Dialog):
         self.setupUi(self)
         self.setupCombos(settings)
         self.imsource = settings['imsource']
+        self.confidenceThreshold = settings['confidenceThreshold']
+        self.psm = settings['psm']
+        self.ocrTimeout = settings['ocrTimeout']
+        self.preset = settings['preset']
+        self.partialTranslations = None  # translations of the lines read so far, while OCR is running
+        self.partialRequests = []  # TranslationRequests of those lines
+        self.pendingLines = []  # lines read since the last partial translation was sent
+        self.lineBatchTimer = QtCore.QTimer(self)
+        self.lineBatchTimer.setSingleShot(True)
+        self.lineBatchTimer.setInterval(LINE_BATCH)
+        self.lineBatchTimer.timeout.connect(self.translatePendingLines)
+        self.textRequest = None
+        self.liveRequest = None
+        self.lineMemo = {}  # {(line, source, dest): translation} of the lines translated while typing
         self.inputTextEdit.returnPressed.connect(self.startTextTranslation)
+        if settings['liveTranslation']:
+            self.inputTextEdit.typingPaused.connect(self.startLiveTranslation)
         self.emptyProgressBar()
         self.reverseLanguages.pressed.connect(self.reverseLang)
         if image is not None:
@@ -35,22 +58,102 @@ class TranslationWindow(QtWidgets.QDialog, Ui_Dialog):
 
     def startTextTranslation(self, text):
         self.infiniteProgressBar()
-        thread = TranslateThread(text, self.sourceLanguageCombo.currentData(),
-                                 self.destinationLanguageCombo.currentData(), self)
-        thread.translatingReady.connect(self.showTranslation)
-        thread.translatingFailed.connect(self.translationFailed)
-        thread.start()
+        for request in (self.textRequest, self.liveRequest):
+            if request is not None:
+                request.cancel()
+        self.liveRequest = None
+        self.textRequest = TranslationRequest(text, self.sourceLanguageCombo.currentData(),
+                                              self.destinationLanguageCombo.currentData(), self)
+        self.textRequest.translatingReady.connect(self.showTranslation)
+        self.textRequest.translatingFailed.connect(self.translationFailed)
+        self.textRequest.start()
+
+    def startLiveTranslation(self, text):
+        """translates the lines that changed since the last translation, while the user types"""
+        if self.liveRequest is not None:
+            self.liveRequest.cancel()
+            self.liveRequest = None
+        source, dest = self.sourceLanguageCombo.currentData(), self.destinationLanguageCombo.currentData()
+        missing = list(dict.fromkeys(line for line in text.split('\n')
+                                     if line.strip() and (line, source, dest) not in self.lineMemo))
+        if not missing:
+            self.showLiveTranslation(source, dest)
+            return
+        self.infiniteProgressBar()
+        request = self.liveRequest = TranslationRequest('\n'.join(missing), source, dest, self,
+                                                        Translate.TranslateLines)
+        request.translatingReady.connect(
+            lambda lines, translations, *languages: self.rememberLines(request, lines, translations, source, dest))
+        request.translatingFailed.connect(self.translationFailed)
+        request.start()
+
+    def rememberLines(self, request, lines, translations, source, dest):
+        if request is not self.liveRequest:
+            return  # finished before its cancel arrived, a newer request is running
+        self.liveRequest = None
+        if len(self.lineMemo) > LINE_MEMO_SIZE:
+            self.lineMemo.clear()
+        for line, translation in zip(lines.split('\n'), translations.split('\n')):
+            self.lineMemo[(line, source, dest)] = translation
+        self.emptyProgressBar()
+        self.showLiveTranslation(source, dest)
+
+    def showLiveTranslation(self, source, dest):
+        """shows the remembered translations of the lines being typed, lines still in flight are blank"""
+        self.outputBrowser.setText('\n'.join(self.lineMemo.get((line, source, dest), '')
+                                             for line in self.inputTextEdit.toPlainText().split('\n')))
 
     def startImageTranslation(self, image):
         self.infiniteProgressBar()
         thread = TranslateThread.byImage(image, self.imsource, self.sourceLanguageCombo.currentData(),
-                                         self.destinationLanguageCombo.currentData(), self)
+                                         self.destinationLanguageCombo.currentData(), self,
+                                         self.confidenceThreshold, self.psm, self.ocrTimeout, self.preset)
         thread.translatingReady.connect(self.showTranslation)
         thread.detectionReady.connect(self.inputTextEdit.setText)
+        thread.lineReady.connect(self.showDetectedLine)
         thread.translatingFailed.connect(self.translationFailed)
+        thread.detectionCancelled.connect(self.detectionCancelled)
+        self.partialTranslations = []
         thread.start()
 
+    def showDetectedLine(self, text, confidence):
+        """shows a line of the capture as soon as it is read, the lines of a text region are translated together"""
+        if self.partialTranslations is None:
+            return
+        self.inputTextEdit.append(text)
+        self.pendingLines.append(text)
+        if not self.lineBatchTimer.isActive():
+            self.lineBatchTimer.start()
+
+    def translatePendingLines(self):
+        if self.partialTranslations is None or not self.pendingLines:
+            return
+        lines, self.pendingLines = self.pendingLines, []
+        first = len(self.partialTranslations)
+        self.partialTranslations.extend([''] * len(lines))
+        request = TranslationRequest('\n'.join(lines), self.sourceLanguageCombo.currentData(),
+                                     self.destinationLanguageCombo.currentData(), self, Translate.TranslateLines)
+        request.translatingReady.connect(
+            lambda source, translation, *languages: self.showPartialTranslation(first, translation.split('\n')))
+        self.partialRequests.append(request)
+        request.start()
+
+    def cancelPartialTranslations(self):
+        self.partialTranslations = None
+        self.pendingLines = []
+        self.lineBatchTimer.stop()
+        for request in self.partialRequests:
+            request.cancel()
+        self.partialRequests = []
+
+    def showPartialTranslation(self, first, translations):
+        if self.partialTranslations is None:
+            return  # the translation of the whole text is already shown
+        self.partialTranslations[first:first + len(translations)] = translations
+        self.outputBrowser.setText('\n'.join(self.partialTranslations))
+
     def showTranslation(self, source, translation, source_language, destination_language):
+        self.cancelPartialTranslations()
         self.inputTextEdit.setText(source)
         cursor = self.inputTextEdit.textCursor()
         cursor.movePosition(QtGui.QTextCursor.End)
@@ -80,6 +183,11 @@ class TranslationWindow(QtWidgets.QDialog, Ui_Dialog):
 
         self.emptyProgressBar()
 
+    def detectionCancelled(self):
+        self.cancelPartialTranslations()
+        self.inputTextEdit.setPlaceholderText('Replaced by a newer capture')
+        self.emptyProgressBar()
+
     def setupCombos(self, settings):
         for i, (code, lang) in enumerate(Translate.languages.items()):
             self.sourceLanguageCombo.addItem(f'{lang.capitalize()} ({code})')
@@ -112,23 +220,73 @@ class TranslationWindow(QtWidgets.QDialog, Ui_Dialog):
         self.settings.save()
 
 
+def deliver(future, ready, failed):
+    """
+    emits the 4-tuple result of a Translate.engine future through the ready signal, or its error through
+    failed. called on the engine's thread, the signals reach their slots in the thread of the receivers
+    """
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        failed.emit(error)
+    else:
+        ready.emit(*future.result())
+
+
+class TranslationRequest(QtCore.QObject):
+    """a text translation made by Translate.engine, no thread of its own"""
+    translatingReady = QtCore.pyqtSignal(str, str, str, str)  # source_text, translation, source_language,
+    #   destination_language
+    translatingFailed = QtCore.pyqtSignal(Exception)
+
+    def __init__(self, text, source, dest, parent=None, function=None):
+        """
+        :param function: function(text, dest, source) that returns the 4 values of translatingReady,
+            Translate.TranslateFromText by default
+        """
+        super(TranslationRequest, self).__init__(parent)
+        self.text = text
+        self.source = source
+        self.dest = dest
+        self.function = function or Translate.TranslateFromText
+        self.future = None
+
+    def start(self):
+        self.future = Translate.engine.submit(self.function, self.text, self.dest, self.source)
+        self.future.add_done_callback(partial(deliver, ready=self.translatingReady, failed=self.translatingFailed))
+
+    def cancel(self):
+        """nothing is emitted after cancelling"""
+        if self.future is not None:
+            self.future.cancel()
+
+
 class TranslateThread(QtCore.QThread):
     translatingReady = QtCore.pyqtSignal(str, str, str, str)  # source_text, translation, source_language,
     #   destination_language
     translatingFailed = QtCore.pyqtSignal(Exception)
     detectionReady = QtCore.pyqtSignal(str)  # detected_text
+    lineReady = QtCore.pyqtSignal(str, float)  # line_text, confidence. lines of the capture while OCR still runs
+    detectionCancelled = QtCore.pyqtSignal()  # a newer capture superseded this one
 
-    def __init__(self, text, source, dest, parent=None, image=None, imsource=None):
+    def __init__(self, text, source, dest, parent=None, image=None, imsource=None, threshold=None, psm='auto',
+                 timeout=0, preset='balanced'):
         super(TranslateThread, self).__init__(parent)
         self.source = source
         self.imsource = imsource
+        self.threshold = threshold
+        self.psm = psm
+        self.timeout = timeout
+        self.preset = preset
         self.dest = dest
         self.text = text
         self.image = image
 
     @classmethod
-    def byImage(cls, image, imsource, source, dest, parent=None):
-        return cls('', source, dest, parent, image, imsource)
+    def byImage(cls, image, imsource, source, dest, parent=None, threshold=None, psm='auto', timeout=0,
+                preset='balanced'):
+        return cls('', source, dest, parent, image, imsource, threshold, psm, timeout, preset)
 
     def run(self, p=None) -> None:
         if self.image is None:
@@ -139,15 +297,27 @@ class TranslateThread(QtCore.QThread):
                 raise e
                 self.translatingFailed.emit(e)
         else:
-            translation_iter = Translate.TranslateFromImage(self.image, self.dest, self.source, self.imsource)
-            source_text = next(translation_iter)
-            self.detectionReady.emit(source_text)
+            # the first confident variant is translated while the others are still read
+            speculation = Translate.speculate(self.dest, self.source)
+            translation_iter = Translate.TranslateFromImage(self.image, self.dest, self.source, self.imsource,
+                                                            self.threshold, self.psm, self.lineReady.emit,
+                                                            self.timeout, self.preset, speculation.offer)
             try:
-                translation, source_language, destination_language = next(translation_iter)
-                self.translatingReady.emit(source_text, translation, source_language, destination_language)
-            except Exception as e:
-                raise e
+                source_text = next(translation_iter)
+            except Translate.tess.TesseractCancelled:
+                speculation.cancel()
+                self.detectionCancelled.emit()
+                return
+            except RuntimeError as e:
+                # timed out
+                speculation.cancel()
                 self.translatingFailed.emit(e)
+                return
+            self.detectionReady.emit(source_text)
+            translation_iter.close()
+            # OCR is done, the engine translates while this thread ends
+            future = speculation.finish(source_text)
+            future.add_done_callback(partial(deliver, ready=self.translatingReady, failed=self.translatingFailed))
 
 
 class progressWindow(QtWidgets.QProgressBar):
@@ -284,15 +454,21 @@ class SmallTranslation:
         self.image = image
         self.parent = parent
         self.imsource = settings['imsource']
+        self.confidenceThreshold = settings['confidenceThreshold']
+        self.psm = settings['psm']
+        self.ocrTimeout = settings['ocrTimeout']
+        self.preset = settings['preset']
         self.source = settings['source']
         self.dest = settings['dest']
         self.startImageTranslation()
 
     def startImageTranslation(self):
         self.showProgressBar()
-        self.thread = TranslateThread.byImage(self.image, self.imsource, self.source, self.dest, self.parent)
+        self.thread = TranslateThread.byImage(self.image, self.imsource, self.source, self.dest, self.parent,
+                                              self.confidenceThreshold, self.psm, self.ocrTimeout, self.preset)
         self.thread.translatingReady.connect(lambda x, y, z: self.showTranslation(x, y, z))
         self.thread.translatingFailed.connect(self.translatingFailed)
+        self.thread.detectionCancelled.connect(self.hideProgressBar)
         self.thread.start()
 
     def translatingFailed(self):
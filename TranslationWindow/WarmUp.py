@@ -0,0 +1,131 @@
+"""
+Keeps the OCR models and the translation client warm. the first capture after
+launch or after a long idle otherwise waits for tesseract to page its
+traineddata files in and for a fresh connection to the translation service.
+"""
+from threading import Thread, Lock, Event
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+COLD = 'cold'
+WARMING = 'warming'
+WARM = 'warm'
+
+TRANSLATOR = 'translator'
+
+
+class WarmUpService:
+    def __init__(self, warmLanguages, warmTranslator, idle=600, checkInterval=30):
+        """
+        :param warmLanguages: function(lang) that reads a tiny image with the tesseract language set
+        :param warmTranslator: function() that makes a tiny translation
+        :param idle: seconds without use after which a language set is warmed again, 0 never re-warms
+        :param checkInterval: seconds between idle checks
+        """
+        self.warmLanguages = warmLanguages
+        self.warmTranslator = warmTranslator
+        self.idle = idle
+        self.checkInterval = checkInterval
+        self.lock = Lock()
+        self.stopped = Event()
+        self.thread = None
+        self.targets = {
+            # {language set or TRANSLATOR: {'state': str, 'used': time.monotonic(), 'warmed': time.monotonic()}}
+        }
+
+    def configure(self, languageSets, idle=None):
+        """
+        Sets the language sets to keep warm and warms the ones that are new.
+        :param languageSets: tesseract language sets, e.g ['heb+eng']
+        """
+        with self.lock:
+            if idle is not None:
+                self.idle = idle
+            wanted = set(languageSets) | {TRANSLATOR}
+            for target in self.targets.keys() - wanted:
+                del self.targets[target]
+            new = [target for target in wanted if target not in self.targets]
+            for target in new:
+                self.targets[target] = {'state': COLD, 'used': None, 'warmed': None}
+        for target in new:
+            self.warm(target)
+        self.start()
+
+    def touch(self, target):
+        """marks a language set (or TRANSLATOR) as used, it is as warm as a warm-up would make it"""
+        with self.lock:
+            if target in self.targets:
+                now = time.monotonic()
+                self.targets[target].update(state=WARM, used=now)
+
+    def warm(self, target):
+        """warms a language set (or TRANSLATOR) in the background unless it is already warming"""
+        with self.lock:
+            if self.targets.get(target, {}).get('state') == WARMING:
+                return
+            self.targets.setdefault(target, {'state': COLD, 'used': None, 'warmed': None})['state'] = WARMING
+        Thread(target=self.run, args=(target,), daemon=True).start()
+
+    def run(self, target):
+        start = time.perf_counter()
+        try:
+            if target == TRANSLATOR:
+                self.warmTranslator()
+            else:
+                self.warmLanguages(target)
+        except Exception as e:
+            logger.info('warming %s failed: %s', target, e)
+            state = COLD
+        else:
+            logger.debug('warmed %s in %.2fs', target, time.perf_counter() - start)
+            state = WARM
+        with self.lock:
+            if target in self.targets:
+                self.targets[target].update(state=state, warmed=time.monotonic())
+
+    def expired(self, info, now):
+        """whether the target went unused (or failed to warm) for the idle period"""
+        last = max(info['used'] or 0, info['warmed'] or 0)
+        return info['state'] != WARMING and now - last >= self.idle
+
+    def check(self):
+        """warms again everything that went unused for the idle period"""
+        with self.lock:
+            if not self.idle:
+                return
+            now = time.monotonic()
+            cold = [target for target, info in self.targets.items() if self.expired(info, now)]
+        for target in cold:
+            self.warm(target)
+
+    def loop(self):
+        while not self.stopped.wait(self.checkInterval):
+            self.check()
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = Thread(target=self.loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def state(self):
+        """
+        diagnostics: {target: {'state': 'cold' | 'warming' | 'warm', 'idleSeconds': float or None}}
+        a warm target that went unused for the idle period is reported cold before it is re-warmed
+        """
+        with self.lock:
+            now = time.monotonic()
+            report = {}
+            for target, info in self.targets.items():
+                last = max(info['used'] or 0, info['warmed'] or 0) or None
+                state = info['state']
+                if state == WARM and self.idle and self.expired(info, now):
+                    state = COLD
+                report[target] = {'state': state, 'idleSeconds': None if last is None else now - last}
+            return report
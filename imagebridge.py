@@ -0,0 +1,29 @@
+from PyQt5 import QtGui
+import numpy
+
+
+class QImageArray(numpy.ndarray):
+    """ndarray whose buffer belongs to a QImage. holds the image so the pixels outlive the caller's copy"""
+    qimage = None
+
+
+def qimageView(image: QtGui.QImage, imageFormat=QtGui.QImage.Format_RGB32) -> numpy.ndarray:
+    """
+    Returns a read only (height, width, 4) uint8 view of the image's pixels.
+    The pixels are converted only if the image is not in imageFormat already,
+    otherwise nothing is copied.
+    """
+    if image.format() != imageFormat:
+        image = image.convertToFormat(imageFormat)
+
+    ptr = image.constBits()  # bits() would detach (deep copy) an implicitly shared image
+    ptr.setsize(image.byteCount())
+    array = numpy.ndarray((image.height(), image.width(), 4), numpy.uint8, buffer=ptr,
+                          strides=(image.bytesPerLine(), 4, 1)).view(QImageArray)
+    array.flags.writeable = False
+    array.qimage = image
+    return array
+
+
+def qpixmapView(pixmap: QtGui.QPixmap, imageFormat=QtGui.QImage.Format_RGB32) -> numpy.ndarray:
+    return qimageView(pixmap.toImage(), imageFormat)
@@ -1,14 +1,22 @@
 from .modded_pytesseract import (  # noqa: F401
+    CancelToken,
     Output,
+    PoolUnavailable,
+    TesseractCancelled,
     TesseractError,
     TesseractNotFoundError,
     TSVNotSupported,
+    columns_to_lists,
     get_tesseract_version,
     image_to_boxes,
     image_to_data,
     image_to_osd,
     image_to_pdf_or_hocr,
     image_to_string,
+    mean_confidence,
+    tsv_to_columns,
+    typed_columns,
     run_and_get_output,
     image_to_data_and_text
 )
+from .pool import TesseractPool  # noqa: F401
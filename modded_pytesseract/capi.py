@@ -0,0 +1,146 @@
+"""
+Minimal ctypes binding of the libtesseract C API.
+
+Only the calls needed to keep a model loaded between recognitions are bound:
+the pool workers create one TessBaseAPI per language set and feed it raw
+pixel buffers for every job.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import shlex
+import sys
+from glob import glob
+
+LIBRARY_PATTERNS = (
+    'libtesseract*.dll',
+    'tesseract*.dll',
+    'libtesseract*.so*',
+    'libtesseract*.dylib',
+)
+
+# tesseract's TessPageSegMode defaults to PSM_SINGLE_BLOCK, like the CLI
+DEFAULT_PSM = 6
+# TessOcrEngineMode.OEM_DEFAULT
+DEFAULT_OEM = 3
+
+
+class TesseractLibraryNotFound(EnvironmentError):
+    def __init__(self):
+        super(TesseractLibraryNotFound, self).__init__(
+            'libtesseract could not be found next to the tesseract executable',
+        )
+
+
+def find_library(tesseract_cmd):
+    """ Looks for libtesseract next to the executable, then on the system path """
+    directory = os.path.dirname(os.path.abspath(tesseract_cmd))
+    for pattern in LIBRARY_PATTERNS:
+        for path in sorted(glob(os.path.join(directory, pattern))):
+            return path
+    return ctypes.util.find_library('tesseract') or ctypes.util.find_library('libtesseract-5')
+
+
+def load_library(library_path):
+    """ Loads libtesseract. raises OSError when it or a library it depends on is missing """
+    directory = os.path.dirname(library_path)
+    if directory and sys.platform.startswith('win32') and directory not in os.environ.get('PATH', ''):
+        # the dll depends on leptonica & co. that ship in the same folder
+        os.environ['PATH'] = directory + os.pathsep + os.environ.get('PATH', '')
+    return ctypes.CDLL(library_path)
+
+
+def find_tessdata(tesseract_cmd):
+    directory = os.path.join(os.path.dirname(os.path.abspath(tesseract_cmd)), 'tessdata')
+    return directory if os.path.isdir(directory) else None
+
+
+def parse_config(config):
+    """
+    Splits a command line config string into the parts the API understands.
+    Returns (psm, oem, tessdata_dir, variables)
+    """
+    psm, oem, tessdata_dir, variables = DEFAULT_PSM, DEFAULT_OEM, None, {}
+    args = shlex.split(config or '')
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        value = args[i + 1] if i + 1 < len(args) else ''
+        if arg in ('--psm', '-psm'):
+            psm = int(value)
+        elif arg == '--oem':
+            oem = int(value)
+        elif arg == '--tessdata-dir':
+            tessdata_dir = value
+        elif arg == '-c' and '=' in value:
+            name, _, var = value.partition('=')
+            variables[name] = var
+        else:
+            i += 1
+            continue
+        i += 2
+    return psm, oem, tessdata_dir, variables
+
+
+class TessBaseAPI:
+    """ A single initialized tesseract engine """
+
+    def __init__(self, library_path, datapath, lang, oem=DEFAULT_OEM):
+        self.lib = lib = load_library(library_path)
+
+        lib.TessBaseAPICreate.restype = ctypes.c_void_p
+        lib.TessBaseAPIDelete.argtypes = (ctypes.c_void_p,)
+        lib.TessBaseAPIEnd.argtypes = (ctypes.c_void_p,)
+        lib.TessBaseAPIClear.argtypes = (ctypes.c_void_p,)
+        lib.TessBaseAPIInit2.argtypes = (ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int)
+        lib.TessBaseAPIInit2.restype = ctypes.c_int
+        lib.TessBaseAPISetVariable.argtypes = (ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p)
+        lib.TessBaseAPISetVariable.restype = ctypes.c_int
+        lib.TessBaseAPISetPageSegMode.argtypes = (ctypes.c_void_p, ctypes.c_int)
+        lib.TessBaseAPISetSourceResolution.argtypes = (ctypes.c_void_p, ctypes.c_int)
+        lib.TessBaseAPISetImage.argtypes = (ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int, ctypes.c_int,
+                                            ctypes.c_int, ctypes.c_int)
+        lib.TessBaseAPIRecognize.argtypes = (ctypes.c_void_p, ctypes.c_void_p)
+        lib.TessBaseAPIRecognize.restype = ctypes.c_int
+        lib.TessBaseAPIGetUTF8Text.argtypes = (ctypes.c_void_p,)
+        lib.TessBaseAPIGetUTF8Text.restype = ctypes.c_void_p
+        lib.TessBaseAPIGetTsvText.argtypes = (ctypes.c_void_p, ctypes.c_int)
+        lib.TessBaseAPIGetTsvText.restype = ctypes.c_void_p
+        lib.TessDeleteText.argtypes = (ctypes.c_void_p,)
+
+        self.handle = lib.TessBaseAPICreate()
+        if lib.TessBaseAPIInit2(self.handle, datapath.encode('utf-8') if datapath else None,
+                                lang.encode('utf-8'), oem) != 0:
+            self.close()
+            raise RuntimeError('Could not initialize tesseract for ' + lang)
+
+    def _take_text(self, pointer):
+        if not pointer:
+            return ''
+        try:
+            return ctypes.string_at(pointer).decode('utf-8')
+        finally:
+            self.lib.TessDeleteText(pointer)
+
+    def recognize(self, data, width, height, bytes_per_pixel, psm=DEFAULT_PSM, variables=None):
+        """ Returns (tsv rows, utf8 text) of a raw, tightly packed pixel buffer """
+        lib = self.lib
+        for name, value in (variables or {}).items():
+            lib.TessBaseAPISetVariable(self.handle, name.encode('utf-8'), value.encode('utf-8'))
+        lib.TessBaseAPISetPageSegMode(self.handle, psm)
+        lib.TessBaseAPISetImage(self.handle, data, width, height, bytes_per_pixel, width * bytes_per_pixel)
+        lib.TessBaseAPISetSourceResolution(self.handle, 70)
+        try:
+            if lib.TessBaseAPIRecognize(self.handle, None) != 0:
+                raise RuntimeError('Recognition failed')
+            return (self._take_text(lib.TessBaseAPIGetTsvText(self.handle, 0)),
+                    self._take_text(lib.TessBaseAPIGetUTF8Text(self.handle)))
+        finally:
+            lib.TessBaseAPIClear(self.handle)
+
+    def close(self):
+        if self.handle:
+            self.lib.TessBaseAPIEnd(self.handle)
+            self.lib.TessBaseAPIDelete(self.handle)
+            self.handle = None
@@ -15,7 +15,7 @@ from os import environ, extsep, remove
 from os.path import normcase, normpath, realpath
 from pkgutil import find_loader
 from tempfile import NamedTemporaryFile
-from threading import Timer
+from threading import Lock, Timer
 
 try:
     from PIL import Image
@@ -24,10 +24,16 @@ except ImportError:
 
 
 tesseract_cmd = 'tesseract'
+# a TesseractPool of warm workers. when set, image_to_data_and_text prefers it
+worker_pool = None
+# feed images through stdin and read the results from stdout instead of temp files
+use_stdio = True
+# what builds without stdin/stdout support print. a bad image says 'Image file stdin cannot be read'
+STDIO_ERRORS = ('cannot open input file: stdin', 'cannot read input file stdin', 'stdout')
 
 numpy_installed = find_loader('numpy') is not None
 if numpy_installed:
-    from numpy import ndarray
+    from numpy import ndarray, ascontiguousarray, uint8, int32, float64, array, asarray, empty
 
 pandas_installed = find_loader('pandas') is not None
 if pandas_installed:
@@ -75,6 +81,10 @@ class TesseractError(RuntimeError):
         self.args = (status, message)
 
 
+class StdioUnsupported(TesseractError):
+    """ The tesseract build can't read the image from stdin or print to stdout """
+
+
 class TesseractNotFoundError(EnvironmentError):
     def __init__(self):
         super(TesseractNotFoundError, self).__init__(
@@ -82,6 +92,15 @@ class TesseractNotFoundError(EnvironmentError):
         )
 
 
+class PoolUnavailable(EnvironmentError):
+    pass
+
+
+class TesseractCancelled(RuntimeError):
+    def __init__(self):
+        super(TesseractCancelled, self).__init__('Tesseract process was cancelled')
+
+
 class TSVNotSupported(EnvironmentError):
     def __init__(self):
         super(TSVNotSupported, self).__init__(
@@ -94,19 +113,72 @@ def kill(process, code):
     process.returncode = code
 
 
+class CancelToken:
+    """ Lets another thread kill the tesseract processes that run on its behalf """
+
+    def __init__(self):
+        self.cancelled = False
+        self.processes = set()
+        self.children = []
+        self.lock = Lock()
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            processes = list(self.processes)
+            children = list(self.children)
+        for process in processes:
+            process.kill()
+        for child in children:
+            child.cancel()
+
+    def child(self):
+        """ A token that is cancelled along with this one but can also be cancelled on its own """
+        token = CancelToken()
+        with self.lock:
+            self.children.append(token)
+            cancelled = self.cancelled
+        if cancelled:
+            token.cancel()
+        return token
+
+    @contextmanager
+    def track(self, process):
+        with self.lock:
+            self.processes.add(process)
+            cancelled = self.cancelled
+        if cancelled:
+            process.kill()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.processes.discard(process)
+            if self.cancelled:
+                raise TesseractCancelled()
+
+
+@contextmanager
+def cancellable(process, cancel=None):
+    if cancel is None:
+        yield
+        return
+    with cancel.track(process):
+        yield
+
+
 @contextmanager
-def timeout_manager(proc, seconds=0):
+def timeout_manager(proc, seconds=0, input_data=None):
     try:
         if not seconds:
-            yield proc.communicate()[1]
+            yield proc.communicate(input_data)
             return
 
         timeout_code = -1
         timer = Timer(seconds, kill, [proc, timeout_code])
         timer.start()
         try:
-            _, error_string = proc.communicate()
-            yield error_string
+            yield proc.communicate(input_data)
         finally:
             timer.cancel()
             if proc.returncode == timeout_code:
@@ -171,6 +243,35 @@ def prepare(image):
     return image, extension
 
 
+def raw_image(image):
+    """ Returns (pixels, width, height, bytes per pixel) of a numpy array or a PIL image """
+    if numpy_installed and isinstance(image, ndarray):
+        image = ascontiguousarray(image, dtype=uint8)
+        height, width = image.shape[:2]
+        return image.tobytes(), width, height, 1 if image.ndim == 2 else image.shape[2]
+
+    image, _ = prepare(image)
+    return image.tobytes(), image.width, image.height, len(image.getbands())
+
+
+def to_pnm(image):
+    """ Encodes an image as an uncompressed PGM (gray) or PPM (color) """
+    if numpy_installed and isinstance(image, ndarray):
+        if image.ndim == 3 and image.shape[2] == 4:
+            image = image[:, :, :3]
+        # arrays are copied only once, straight into the encoded buffer
+        image = ascontiguousarray(image, dtype=uint8)
+        height, width = image.shape[:2]
+        data, channels = image.data, 1 if image.ndim == 2 else image.shape[2]
+    else:
+        data, width, height, channels = raw_image(image)
+
+    if channels not in (1, 3):
+        raise TypeError('Unsupported image format/type')
+
+    return b''.join((b'%s\n%d %d\n255\n' % (b'P5' if channels == 1 else b'P6', width, height), data))
+
+
 @contextmanager
 def save(image):
     try:
@@ -179,6 +280,14 @@ def save(image):
                 yield f.name, realpath(normpath(normcase(image)))
                 return
 
+            if numpy_installed and isinstance(image, ndarray):
+                # written as is, without a round trip through PIL
+                input_file_name = f.name + extsep + 'pnm'
+                with open(input_file_name, 'wb') as input_file:
+                    input_file.write(to_pnm(image))
+                yield f.name, input_file_name
+                return
+
             image, extension = prepare(image)
             input_file_name = f.name + extsep + extension
             image.save(input_file_name, **image.info)
@@ -209,15 +318,7 @@ def subprocess_args(include_stdout=True):
     return kwargs
 
 
-def run_tesseract(
-    input_filename,
-    output_filename_base,
-    extension,
-    lang,
-    config='',
-    nice=0,
-    timeout=0,
-):
+def tesseract_args(input_filename, output_filename_base, extension, lang, config='', nice=0):
     cmd_args = []
 
     if not sys.platform.startswith('win32') and nice != 0:
@@ -235,16 +336,39 @@ def run_tesseract(
         for ext in extension.split(" "):
             cmd_args.append(ext)
 
+    return cmd_args
+
+
+def start_tesseract(cmd_args, nice=0):
+    kwargs = subprocess_args()
+    if sys.platform.startswith('win32') and nice > 0:
+        # windows has no nice, lower the priority class instead
+        kwargs['creationflags'] = subprocess.BELOW_NORMAL_PRIORITY_CLASS
     try:
-        proc = subprocess.Popen(cmd_args, **subprocess_args())
+        return subprocess.Popen(cmd_args, **kwargs)
     except OSError as e:
         if e.errno != ENOENT:
             raise e
         raise TesseractNotFoundError()
 
-    with timeout_manager(proc, timeout) as error_string:
-        if proc.returncode:
+
+def run_tesseract(
+    input_filename,
+    output_filename_base,
+    extension,
+    lang,
+    config='',
+    nice=0,
+    timeout=0,
+    input_data=None,
+    cancel=None,
+):
+    proc = start_tesseract(tesseract_args(input_filename, output_filename_base, extension, lang, config, nice), nice)
+
+    with cancellable(proc, cancel), timeout_manager(proc, timeout, input_data) as (output, error_string):
+        if proc.returncode and not (cancel is not None and cancel.cancelled):
             raise TesseractError(proc.returncode, get_errors(error_string))
+    return output
 
 
 def run_and_get_output(
@@ -255,6 +379,7 @@ def run_and_get_output(
     nice=0,
     timeout=0,
     return_bytes=False,
+    cancel=None,
 ):
 
     with save(image) as (temp_name, input_filename):
@@ -266,6 +391,7 @@ def run_and_get_output(
             'config': config,
             'nice': nice,
             'timeout': timeout,
+            'cancel': cancel,
         }
 
         run_tesseract(**kwargs)
@@ -284,6 +410,7 @@ def run_and_get_output2(
     nice=0,
     timeout=0,
     return_bytes=False,
+    cancel=None,
 ):
 
     with save(image) as (temp_name, input_filename):
@@ -295,6 +422,7 @@ def run_and_get_output2(
             'config': config,
             'nice': nice,
             'timeout': timeout,
+            'cancel': cancel,
         }
 
         run_tesseract(**kwargs)
@@ -308,6 +436,30 @@ def run_and_get_output2(
                     yield output_file.read().decode('utf-8').strip()
 
 
+def run_and_get_stdout(
+    image,
+    extension='',
+    lang=None,
+    config='',
+    nice=0,
+    timeout=0,
+    cancel=None,
+):
+    """
+    Pipes the image to tesseract as a PNM and returns what it prints.
+    raises StdioUnsupported when the build can't use the pipes, TesseractError for anything else
+    """
+    try:
+        output = run_tesseract('stdin', 'stdout', extension, lang, config, nice, timeout, to_pnm(image), cancel)
+    except TesseractError as e:
+        if any(error in e.message.lower() for error in STDIO_ERRORS):
+            raise StdioUnsupported(e.status, e.message)
+        raise
+    if not output:
+        raise StdioUnsupported(0, 'Tesseract printed no output')
+    return output.decode('utf-8').strip()
+
+
 def file_to_dict(tsv, cell_delimiter, str_col_idx):
     result = {}
     rows = [row.split(cell_delimiter) for row in tsv.split('\n')]
@@ -338,6 +490,85 @@ def file_to_dict(tsv, cell_delimiter, str_col_idx):
     return result
 
 
+def tsv_to_columns(tsv):
+    """
+    Parses tesseract's TSV output column by column. every column but the last
+    (text, a list of str) is a numpy array, conf of floats and the rest of int32
+    """
+    lines = tsv.split('\n')
+    header = lines.pop(0).split('\t')
+    lines = [line for line in lines if line]
+    width = len(header)
+    if lines and lines[-1].count('\t') < width - 1:
+        # the last row lost its empty text cell to strip()
+        lines[-1] += '\t'
+
+    texts = []
+    numbers = []
+    for line in lines:
+        prefix, _, text = line.rpartition('\t')
+        numbers.append(prefix)
+        texts.append(text)
+    if numbers:
+        numbers = array('\t'.join(numbers).split('\t'), dtype=float64).reshape(len(lines), width - 1)
+    else:
+        numbers = empty((0, width - 1), dtype=float64)
+
+    result = {
+        head: numbers[:, i] if head == 'conf' else numbers[:, i].astype(int32)
+        for i, head in enumerate(header[:-1])
+    }
+    result[header[-1]] = texts
+    return result
+
+
+def typed_columns(data):
+    """ Converts a {column: list} TSV dict (e.g. loaded from JSON) to the types of tsv_to_columns """
+    return {
+        head: list(values) if head == 'text' else asarray(values, dtype=float64 if head == 'conf' else int32)
+        for head, values in data.items()
+    }
+
+
+def columns_to_lists(data):
+    """ The reverse of typed_columns, for serializing """
+    return {head: list(values) if head == 'text' else values.tolist() for head, values in data.items()}
+
+
+def mean_confidence(data):
+    """ Mean confidence of the recognized words of a tsv_to_columns dict, -1 if there are none """
+    conf = data['conf']
+    words = conf[conf >= 0]
+    return float(words.mean()) if words.size else -1
+
+
+def tsv_to_text(data):
+    """ Rebuilds tesseract's plain text output from the word rows of a TSV dict """
+    paragraphs, lines, words = [], [], []
+    last_paragraph = last_line = None
+    rows = zip(data['level'], data['page_num'], data['block_num'], data['par_num'], data['line_num'], data['text'])
+    for level, page, block, par, line, text in rows:
+        if level != 5 or not text.strip():
+            continue
+        if (page, block, par) != last_paragraph:
+            if words:
+                lines.append(' '.join(words))
+            if lines:
+                paragraphs.append('\n'.join(lines))
+            words, lines = [], []
+        elif line != last_line and words:
+            lines.append(' '.join(words))
+            words = []
+        last_paragraph, last_line = (page, block, par), line
+        words.append(text)
+
+    if words:
+        lines.append(' '.join(words))
+    if lines:
+        paragraphs.append('\n'.join(lines))
+    return '\n\n'.join(paragraphs)
+
+
 def is_valid(val, _type):
     if _type is int:
         return val.isdigit()
@@ -476,24 +707,42 @@ def image_to_data_and_text(
     config='',
     nice=0,
     timeout=0,
+    cancel=None,
 ):
     """
-    Returns string containing box boundaries, confidences,
+    Returns (tsv_to_columns dict, text) with the box boundaries, confidences,
     and other information. Requires Tesseract 3.05+
     """
 
+    if worker_pool is not None and not isinstance(image, str):
+        try:
+            d, s = worker_pool.run(image, lang, config, timeout, cancel)
+            return tsv_to_columns(d), s
+        except PoolUnavailable:
+            pass
+
     if get_tesseract_version() < '3.05':
         raise TSVNotSupported()
 
     config = '{} {}'.format('-c tessedit_create_tsv=1', config.strip()).strip()
-    args = [image, 'tsv txt', lang, config, nice, timeout]
+
+    if use_stdio and not isinstance(image, str):
+        try:
+            d = tsv_to_columns(run_and_get_stdout(image, 'tsv', lang, config, nice, timeout, cancel))
+            return d, tsv_to_text(d)
+        except (StdioUnsupported, KeyError):
+            # builds that can't read stdin/write stdout fall back to temp files. a genuine
+            # TesseractError, e.g a missing language, would only fail again
+            pass
+
+    args = [image, 'tsv txt', lang, config, nice, timeout, False, cancel]
 
     d, s = run_and_get_output2(*args)
-    return file_to_dict(d, '\t', -1), s
+    return tsv_to_columns(d), s
 
 
 def image_to_osd(
-    image, lang='osd', config='', nice=0, output_type=Output.STRING, timeout=0,
+    image, lang='osd', config='', nice=0, output_type=Output.STRING, timeout=0, cancel=None,
 ):
     """
     Returns string containing the orientation and script detection (OSD)
@@ -504,9 +753,9 @@ def image_to_osd(
     args = [image, 'osd', lang, config, nice, timeout]
 
     return {
-        Output.BYTES: lambda: run_and_get_output(*(args + [True])),
-        Output.DICT: lambda: osd_to_dict(run_and_get_output(*args)),
-        Output.STRING: lambda: run_and_get_output(*args),
+        Output.BYTES: lambda: run_and_get_output(*(args + [True]), cancel=cancel),
+        Output.DICT: lambda: osd_to_dict(run_and_get_output(*args, cancel=cancel)),
+        Output.STRING: lambda: run_and_get_output(*args, cancel=cancel),
     }[output_type]()
 
 
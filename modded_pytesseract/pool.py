@@ -0,0 +1,256 @@
+"""
+Pool of long lived tesseract workers.
+
+Every worker is a separate process that loads libtesseract once, initializes
+it with a language set and then takes recognition jobs over a pipe, so the
+traineddata files are read only when a worker starts and not on every pass.
+Workers are recycled after `max_jobs` jobs or when they crash.
+"""
+
+import multiprocessing
+from queue import Queue, Empty
+from threading import Lock
+
+from . import modded_pytesseract as tesseract
+from .capi import TessBaseAPI, find_library, find_tessdata, load_library, parse_config
+from .modded_pytesseract import PoolUnavailable, TesseractCancelled, TesseractError, cancellable, raw_image
+
+TSV_HEADER = 'level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\t' \
+             'left\ttop\twidth\theight\tconf\ttext\n'
+
+READY = 'ready'
+OK = 'ok'
+ERROR = 'error'
+
+
+def serve(connection, library_path, datapath, lang, oem):
+    """ Worker process main loop. answers every job with (status, result) """
+    try:
+        api = TessBaseAPI(library_path, datapath, lang, oem)
+    except Exception as e:
+        connection.send((ERROR, str(e)))
+        return
+    connection.send((READY, None))
+    try:
+        while True:
+            try:
+                job = connection.recv()
+            except EOFError:
+                break
+            if job is None:
+                break
+            try:
+                connection.send((OK, api.recognize(*job)))
+            except Exception as e:
+                connection.send((ERROR, str(e)))
+    finally:
+        api.close()
+        connection.close()
+
+
+class Worker:
+    def __init__(self, key, library_path, datapath, start_timeout):
+        lang, oem = key[:2]
+        self.key = key
+        self.jobs = 0
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=serve, args=(child, library_path, datapath, lang, oem),
+                                               daemon=True)
+        self.process.start()
+        child.close()
+        if not self.connection.poll(start_timeout):
+            self.close()
+            raise PoolUnavailable('tesseract worker did not start in time')
+        status, message = self.connection.recv()
+        if status != READY:
+            self.close()
+            raise PoolUnavailable(message)
+
+    def run(self, job, timeout=0):
+        self.jobs += 1
+        self.connection.send(job)
+        if timeout and not self.connection.poll(timeout):
+            self.close()
+            raise RuntimeError('Tesseract process timeout')
+        status, result = self.connection.recv()
+        if status == ERROR:
+            raise TesseractError(-1, result)
+        return result
+
+    def close(self):
+        try:
+            self.connection.send(None)
+        except (OSError, ValueError):
+            pass
+        self.connection.close()
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+
+
+class TesseractPool:
+    def __init__(self, size=2, max_jobs=200, start_timeout=30):
+        """
+        :param size: maximum number of workers for every language set
+        :param max_jobs: jobs a worker serves before it is replaced
+        :param start_timeout: seconds to wait for a worker to load its models
+        """
+        self.size = size
+        self.max_jobs = max_jobs
+        self.start_timeout = start_timeout
+        self.library_path = None
+        self.lock = Lock()
+        self.idle = {
+            # {(lang, oem, tessdata, variables): Queue[Worker]}
+        }
+        self.count = {
+            # {(lang, oem, tessdata, variables): number of live workers}
+        }
+        self.hits = 0
+        self.misses = 0
+        self.crashes = 0
+        self.recycled = 0
+
+    def library(self):
+        """ Returns the path of libtesseract, raises PoolUnavailable when it isn't found or doesn't load """
+        if self.library_path is None:
+            path = find_library(tesseract.tesseract_cmd) or ''
+            if path:
+                try:
+                    load_library(path)
+                except OSError:
+                    path = ''
+            self.library_path = path
+        if not self.library_path:
+            raise PoolUnavailable('libtesseract was not found or does not load')
+        return self.library_path
+
+    def available(self):
+        """ Whether the pool can run jobs. without libtesseract every job would fall back to the executable """
+        try:
+            self.library()
+        except PoolUnavailable:
+            return False
+        return True
+
+    @staticmethod
+    def key(lang, config):
+        """
+        Workers are kept by everything they are initialized with. -c variables are set with
+        SetVariable and stick to the engine, so jobs with other variables get other workers
+        """
+        _, oem, tessdata_dir, variables = parse_config(config)
+        return lang or 'eng', oem, tessdata_dir, tuple(sorted(variables.items()))
+
+    def start_worker(self, key):
+        datapath = key[2] or find_tessdata(tesseract.tesseract_cmd)
+        try:
+            return Worker(key, self.library(), datapath, self.start_timeout)
+        except BaseException:
+            with self.lock:
+                self.count[key] -= 1
+            raise
+
+    def acquire(self, key):
+        while True:
+            with self.lock:
+                idle = self.idle.setdefault(key, Queue())
+                try:
+                    worker = idle.get_nowait()
+                    self.hits += 1
+                    return worker
+                except Empty:
+                    pass
+                create = self.count.get(key, 0) < self.size
+                if create:
+                    self.count[key] = self.count.get(key, 0) + 1
+                    self.misses += 1
+            if create:
+                return self.start_worker(key)
+            try:
+                # all workers are busy. a worker that crashes meanwhile frees a slot
+                worker = idle.get(timeout=.5)
+            except Empty:
+                continue
+            with self.lock:
+                self.hits += 1
+            return worker
+
+    def release(self, worker):
+        if worker.jobs >= self.max_jobs:
+            self.discard(worker)
+            with self.lock:
+                self.recycled += 1
+            return
+        self.idle[worker.key].put(worker)
+
+    def discard(self, worker):
+        worker.close()
+        with self.lock:
+            self.count[worker.key] -= 1
+
+    def run(self, image, lang=None, config='', timeout=0, cancel=None):
+        """ Returns (tsv, text) of the image, recognized by a warm worker """
+        self.library()  # no library, no miss: the caller reads the image with the executable
+        psm, _, _, variables = parse_config(config)
+        key = self.key(lang, config)
+        data, width, height, channels = raw_image(image)
+        job = (data, width, height, channels, psm, variables)
+        for _ in range(2):
+            worker = self.acquire(key)
+            try:
+                with cancellable(worker.process, cancel):
+                    tsv, text = worker.run(job, timeout)
+            except TesseractCancelled:
+                # the worker was killed to cancel the job
+                self.discard(worker)
+                raise
+            except (EOFError, OSError):
+                # the worker died mid-job, replace it and try again
+                with self.lock:
+                    self.crashes += 1
+                self.discard(worker)
+                continue
+            except TesseractError:
+                self.release(worker)
+                raise
+            except RuntimeError:
+                # timed out, the worker was killed
+                self.discard(worker)
+                raise
+            except BaseException:
+                # interrupted while the reply may still be on its way, the next job would read it
+                self.discard(worker)
+                raise
+            self.release(worker)
+            return (TSV_HEADER + tsv).strip(), text.strip()
+        raise PoolUnavailable('tesseract worker keeps crashing')
+
+    def warm(self, lang=None, config=''):
+        """ Starts a worker for the language set if there is none yet """
+        self.library()
+        key = self.key(lang, config)
+        with self.lock:
+            if self.count.get(key, 0):
+                return
+            self.count[key] = 1
+            self.idle.setdefault(key, Queue())
+        self.release(self.start_worker(key))
+
+    def stats(self):
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'crashes': self.crashes,
+                'recycled': self.recycled,
+                'workers': sum(self.count.values()),
+            }
+
+    def shutdown(self):
+        for key, idle in self.idle.items():
+            while True:
+                try:
+                    self.discard(idle.get_nowait())
+                except Empty:
+                    break